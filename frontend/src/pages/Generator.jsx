@@ -254,7 +254,7 @@ const Generator = ({ setGeneratedImage }) => {
               <div className="file-upload">
                 <input 
                   type="file" 
-                  accept=".txt,.pdf" 
+                  accept=".txt,.pdf,.docx" 
                   onChange={handleFileUpload} 
                   className="file-input"
                 />
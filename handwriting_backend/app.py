@@ -1,102 +1,676 @@
-from flask import Flask, request, jsonify, send_file
+import time
+# Start of app setup, so cold-start import time can be checked against its budget
+IMPORT_START = time.perf_counter()
+
+from flask import Flask, request, jsonify, send_file, g, Response
 from flask_cors import CORS
 import os
 import uuid
-from datetime import datetime
-from models.handwriting_generator import HandwritingGenerator
+import json
+import hashlib
+import logging
+import threading
 from models.text_processor import TextProcessor
+from models.style_manager import StyleManager
 from config import Config
-import PyPDF2
-import io
+from utils.job_queue import JobQueue, QueueFullError, QueueClosedError
+from utils.sample_index import SampleIndex
+from utils import metrics
+from utils.document_ingest import DocumentIngestor, UploadTooLargeError, DocumentLimitError
+from werkzeug.exceptions import RequestEntityTooLarge
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(level=Config.LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+class InvalidParameterError(ValueError):
+    """Raised when a request parameter is malformed or out of range; answered with 400"""
 
 app = Flask(__name__)
 CORS(app)
 
+# Reject oversized request bodies before they are buffered (the margin covers form fields)
+app.config['MAX_CONTENT_LENGTH'] = Config.UPLOAD_MAX_BYTES + 1024 * 1024
+
+# Responses of these endpoints carry a Server-Timing header with their render stages
+SERVER_TIMING_ENDPOINTS = {'generate_handwriting', 'render_handwriting', 'generate_batch', 'download_handwriting'}
+
 # Initialize components
-generator = HandwritingGenerator()
 text_processor = TextProcessor()
+# Style metadata only; listing styles does not need the rendering stack
+style_manager = StyleManager()
+
+# The generator pulls in NumPy, Pillow and OpenCV, so it is built on first use
+# (normally by the warm-up stage) rather than while the app is imported
+_generator = None
+_generator_lock = threading.Lock()
+
+def get_generator():
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                from models.handwriting_generator import HandwritingGenerator
+                _generator = HandwritingGenerator()
+    return _generator
+
+# Uploads are spooled to disk and their text extracted page by page
+ingestor = DocumentIngestor()
+
+# Batch items share one generator, so all workers reuse its caches
+batch_executor = ThreadPoolExecutor(max_workers=Config.BATCH_WORKERS)
+
+# Store generated samples in a durable index shared by all worker processes
+sample_index = SampleIndex()
+
+# Render jobs persisted in sqlite and processed by background workers
+# (the handler is looked up lazily since it is defined further down)
+job_queue = JobQueue(handler=lambda params, progress: _run_job(params, progress))
+
+# Cache counters are read from the generator whenever metrics are scraped
+metrics.REGISTRY.add_collector(lambda: metrics.cache_families(_generator.cache_stats() if _generator else {}))
 
-# Store generated samples
-generated_samples = {}
+# Warm-up: fonts, paper templates and common glyphs are loaded in the background and
+# /api/ready reports ready once they are; glyph variants and frequent words follow
+ready = threading.Event()
+startup = {'import_seconds': None, 'warmup_seconds': None}
+
+def _warm_up():
+    try:
+        if Config.WARMUP:
+            startup['warmup_seconds'] = get_generator().warm_up()
+    except Exception as e:
+        logger.exception("Warm-up failed: %s", e)
+    finally:
+        # A failed warm-up only costs speed; requests still render on cold caches
+        ready.set()
+    if Config.WARMUP:
+        get_generator().prewarm_caches()
+
+def start_services():
+    """Start the background threads of a serving process.
+    
+    Called by the server entry points rather than at import: page workers are
+    spawned processes that re-import the main module, and importing the app
+    (tooling, workers) must not claim queued jobs or start GC and warm-up.
+    """
+    sample_index.start_gc()
+    job_queue.start()
+    threading.Thread(target=_warm_up, name='warm-up', daemon=True).start()
+
+metrics.REGISTRY.add_collector(lambda: [
+    ('handwriting_startup_seconds', 'gauge', 'Time spent importing the app and warming its caches',
+     [({'phase': phase.split('_')[0]}, seconds) for phase, seconds in startup.items() if seconds is not None]),
+    ('handwriting_ready', 'gauge', '1 once the warm-up stage has finished', [({}, int(ready.is_set()))])
+])
+
+@app.before_request
+def start_stage_timing():
+    g.request_start = time.perf_counter()
+    g.stage_events = metrics.start_collecting()
+
+@app.after_request
+def add_server_timing(response):
+    events = metrics.stop_collecting()
+    if request.endpoint in SERVER_TIMING_ENDPOINTS:
+        total = time.perf_counter() - g.request_start
+        response.headers['Server-Timing'] = metrics.server_timing(events, total=total)
+    return response
 
 @app.route('/api/generate', methods=['POST'])
 def generate_handwriting():
     try:
         # Get parameters
-        text = request.form.get('text', '')
         language = request.form.get('language', 'english')
         style = request.form.get('style', 'casual')
         size = request.form.get('size', 'medium')
         ink_color = request.form.get('ink_color', '#000000')  # Default black
+        render_mode = _parse_render_mode(request.form.get('render_mode'))
+        seed = _parse_seed(request.form.get('seed'))
         
-        # Process uploaded file if present
-        if 'file' in request.files:
-            file = request.files['file']
-            if file.filename.endswith('.pdf'):
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-                text = ''
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-            else:
-                text = file.read().decode('utf-8')
+        with _open_request_chunks() as chunks:
+            if chunks.empty():
+                return jsonify({'success': False, 'error': 'No text provided'}), 400
+            
+            if _is_true(request.form.get('paginate')):
+                output_format = request.form.get('output_format', 'pdf').lower()
+                return jsonify(_generate_document(chunks, language, style, size, ink_color, output_format,
+                                                  render_mode=render_mode))
+            
+            # A single page only needs as much of the document as fits on it
+            text = _first_page_text(chunks, language, style, size)
         
-        if not text:
-            return jsonify({'success': False, 'error': 'No text provided'}), 400
+        sample_id = _render_sample(text, language, style, size, ink_color, seed=seed,
+                                   render_mode=render_mode, **_encoding_options(request.form))
+        
+        # Return preview URL
+        preview_url = f'/api/preview/{sample_id}'
         
-        # Generate unique sample ID
-        sample_id = str(uuid.uuid4())
+        return jsonify({
+            'success': True,
+            'sample_id': sample_id,
+            'preview_url': preview_url
+        })
         
-        # Process text (translation happens inside generator now)
-        processed_text = text_processor.process(text, language)
+    except InvalidParameterError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except (UploadTooLargeError, DocumentLimitError, RequestEntityTooLarge) as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/render', methods=['POST'])
+def render_handwriting():
+    """Render and stream the image directly, without persisting it to disk"""
+    try:
+        language = request.form.get('language', 'english')
+        style = request.form.get('style', 'casual')
+        size = request.form.get('size', 'medium')
+        with _open_request_chunks() as chunks:
+            if chunks.empty():
+                return jsonify({'success': False, 'error': 'No text provided'}), 400
+            text = _first_page_text(chunks, language, style, size)
         
-        # Generate handwriting with ink color
-        output_path = generator.generate(
-            text=processed_text,
+        options = _encoding_options(request.form)
+        buffer, mimetype = get_generator().render_bytes(
+            text=text_processor.process(text, language),
             language=language,
             style=style,
             size=size,
-            ink_color=ink_color,
-            sample_id=sample_id
+            ink_color=request.form.get('ink_color', '#000000'),
+            output_format=options['image_format'],
+            quality=options['quality'],
+            compress_level=options['compress_level'],
+            dpi=_parse_dpi(request.form.get('dpi')),
+            seed=_parse_seed(request.form.get('seed')),
+            render_mode=_parse_render_mode(request.form.get('render_mode'))
         )
+        extension = get_generator().encoder.extension(options['image_format'])
+        return send_file(buffer, mimetype=mimetype, download_name=f'handwriting.{extension}')
         
-        # Store sample info
-        generated_samples[sample_id] = {
-            'path': output_path,
-            'timestamp': datetime.now(),
-            'text': text,
-            'language': language,
-            'style': style,
-            'ink_color': ink_color
-        }
+    except InvalidParameterError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except (UploadTooLargeError, DocumentLimitError, RequestEntityTooLarge) as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _encoding_options(source):
+    """Read image format and encoder tuning from form fields or a JSON item"""
+    def optional_int(name, low, high):
+        value = source.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            number = None
+        if number is None or not low <= number <= high:
+            raise InvalidParameterError(f'{name} must be an integer from {low} to {high}')
+        return number
+    
+    image_format = str(source.get('image_format') or 'png').lower()
+    if image_format not in Config.IMAGE_FORMATS:
+        raise InvalidParameterError(f"image_format must be one of {', '.join(Config.IMAGE_FORMATS)}")
+    
+    return {
+        'image_format': image_format,
+        'quality': optional_int('quality', 1, 100),
+        'compress_level': optional_int('compress_level', 0, 9)
+    }
+
+def _parse_seed(value):
+    """Optional integer render seed from a form field or JSON item"""
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidParameterError(f'seed must be an integer, got {value!r}') from None
+
+def _parse_dpi(value):
+    """Render DPI from a form field: 'preview', 'full' (the default) or a number in the allowed range"""
+    if value in (None, '', 'full'):
+        return None
+    if value == 'preview':
+        return Config.PREVIEW_DPI
+    dpi = int(value) if value.isdigit() else 0
+    if not Config.MIN_RENDER_DPI <= dpi <= Config.DPI:
+        raise InvalidParameterError(f'dpi must be preview, full or {Config.MIN_RENDER_DPI}-{Config.DPI}')
+    return dpi
+
+def _parse_render_mode(value):
+    """Render mode from a form field or JSON item; unknown modes fall back to glyph blitting"""
+    return value if value in Config.RENDER_MODES else 'glyph'
+
+def _open_request_chunks():
+    """Return a ChunkStream over the uploaded file if there is one, else the submitted text"""
+    upload = request.files.get('file')
+    if upload and upload.filename:
+        return ingestor.open_upload(upload)
+    return ingestor.iter_text(request.form.get('text', ''))
+
+def _first_page_text(chunks, language, style, size):
+    """Read chunks only until the first page is laid out; returns the source text consumed"""
+    consumed = []
+    
+    def processed():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield text_processor.process(chunk, language)
+    
+    next(get_generator().layout_pages(processed(), language, style, size), None)
+    return '\n'.join(consumed)
+
+def _is_true(value):
+    return str(value).lower() in ('true', '1', 'yes')
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    source = {}
+    try:
+        # Uploads stay spooled on disk and are read by the worker that runs the job
+        upload = request.files.get('file')
+        if upload and upload.filename:
+            source = {'upload_path': ingestor.spool(upload.stream, upload.filename), 'filename': upload.filename}
+        else:
+            text = request.form.get('text', '')
+            if not text.strip():
+                return jsonify({'success': False, 'error': 'No text provided'}), 400
+            if len(text) > Config.UPLOAD_MAX_CHARS:
+                raise DocumentLimitError(f'Document exceeds {Config.UPLOAD_MAX_CHARS} characters')
+            source = {'text': text}
         
-        # Return preview URL
-        preview_url = f'/api/preview/{sample_id}'
+        job_id = job_queue.submit({
+            **source,
+            'language': request.form.get('language', 'english'),
+            'style': request.form.get('style', 'casual'),
+            'size': request.form.get('size', 'medium'),
+            'ink_color': request.form.get('ink_color', '#000000'),
+            'paginate': _is_true(request.form.get('paginate')),
+            'output_format': request.form.get('output_format', 'pdf').lower(),
+            'seed': _parse_seed(request.form.get('seed')),
+            'render_mode': _parse_render_mode(request.form.get('render_mode')),
+            **_encoding_options(request.form)
+        })
+    except (UploadTooLargeError, DocumentLimitError, RequestEntityTooLarge) as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except InvalidParameterError as e:
+        _discard_upload(source)
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except QueueFullError as e:
+        _discard_upload(source)
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Retry-After'] = str(Config.JOB_RETRY_AFTER)
+        return response, 429
+    except QueueClosedError as e:
+        _discard_upload(source)
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        _discard_upload(source)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/api/jobs/{job_id}'
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, **job})
+
+def _discard_upload(source):
+    """Delete a spooled upload whose job was never queued"""
+    if source.get('upload_path'):
+        ingestor.remove(source['upload_path'])
+
+def _run_job(params, progress):
+    """Render a queued job inside a queue worker thread"""
+    if params.get('upload_path'):
+        chunks = ingestor.iter_file(params['upload_path'], params.get('filename'), remove=True)
+    else:
+        chunks = ingestor.iter_text(params['text'])
+    
+    with chunks:
+        if chunks.empty():
+            raise ValueError('No text provided')
         
+        if params.get('paginate'):
+            return _generate_document(
+                chunks, params['language'], params['style'], params['size'],
+                params['ink_color'], params.get('output_format', 'pdf'), progress=progress,
+                render_mode=params.get('render_mode', 'glyph')
+            )
+        
+        text = _first_page_text(chunks, params['language'], params['style'], params['size'])
+    
+    sample_id = _render_sample(
+        text, params['language'], params['style'], params['size'],
+        params['ink_color'], progress=progress, seed=params.get('seed'),
+        render_mode=params.get('render_mode', 'glyph'), **_encoding_options(params)
+    )
+    return {
+        'success': True,
+        'sample_id': sample_id,
+        'preview_url': f'/api/preview/{sample_id}'
+    }
+
+@app.route('/api/generate/batch', methods=['POST'])
+def generate_batch():
+    payload = request.get_json(silent=True)
+    items = payload.get('items') if isinstance(payload, dict) else payload
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'No items provided'}), 400
+    if len(items) > Config.BATCH_MAX_ITEMS:
         return jsonify({
+            'success': False,
+            'error': f'Batch too large (max {Config.BATCH_MAX_ITEMS} items)'
+        }), 400
+    
+    # Results come back in submission order; one failed item does not fail the batch
+    futures = [batch_executor.submit(_render_batch_item, item) for item in items]
+    results = []
+    for future in futures:
+        result, stage_events = future.result()
+        results.append(result)
+        # Items render on executor threads; fold their stages into this response's timing
+        g.stage_events.extend(stage_events)
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'sample_ids': [result.get('sample_id') for result in results],
+        'failed': sum(1 for result in results if not result['success'])
+    })
+
+def _render_batch_item(item):
+    """Render one batch entry on an executor thread; returns (result, stage timings)"""
+    metrics.start_collecting()
+    try:
+        result = _render_batch_entry(item)
+    finally:
+        stage_events = metrics.stop_collecting()
+    return result, stage_events
+
+def _render_batch_entry(item):
+    """Render one batch entry, reporting errors instead of raising"""
+    try:
+        if not isinstance(item, dict):
+            raise ValueError('Item must be an object')
+        
+        text = item.get('text', '')
+        if not text:
+            raise ValueError('No text provided')
+        
+        sample_id = _render_sample(
+            text,
+            item.get('language', 'english'),
+            item.get('style', 'casual'),
+            item.get('size', 'medium'),
+            item.get('ink_color', '#000000'),
+            seed=_parse_seed(item.get('seed')),
+            render_mode=_parse_render_mode(item.get('render_mode')),
+            **_encoding_options(item)
+        )
+        return {
             'success': True,
             'sample_id': sample_id,
-            'preview_url': preview_url
-        })
-        
+            'preview_url': f'/api/preview/{sample_id}'
+        }
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return {'success': False, 'sample_id': None, 'error': str(e)}
+
+def _content_hash(params):
+    """Stable hex digest of render parameters"""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+def _render_sample(text, language, style, size, ink_color, progress=None,
+                   image_format='png', quality=None, compress_level=None, seed=None, render_mode='glyph'):
+    """Render a preview-resolution sample and register it for preview/download.
+    
+    Samples are content-addressed: the id hashes every input plus the seed,
+    so an identical submission returns the stored render without re-rendering.
+    """
+    params = {
+        'text': text,
+        'language': language,
+        'style': style,
+        'size': size,
+        'ink_color': ink_color,
+        'image_format': image_format,
+        'quality': quality,
+        'compress_level': compress_level,
+        'render_mode': render_mode,
+        'preview_dpi': Config.PREVIEW_DPI,
+        'render_version': Config.RENDER_VERSION
+    }
+    if seed is None:
+        # Unseeded submissions take a seed derived from their content, so they are reproducible too
+        seed = int(_content_hash(params)[:8], 16)
+    sample_id = _content_hash(dict(params, seed=seed))
+    
+    sample = sample_index.get(sample_id)
+    if sample and os.path.exists(sample['path']):
+        metrics.RESULT_CACHE_LOOKUPS.inc(result='hit')
+        # A resubmitted sample is in use again; keep GC from removing it under the returned URL
+        sample_index.touch(sample_id)
+        return sample_id
+    metrics.RESULT_CACHE_LOOKUPS.inc(result='miss')
+    
+    # Process text (translation happens inside generator now)
+    processed_text = text_processor.process(text, language)
+    
+    # Only the screen-sized preview is rendered now; full resolution waits for a download.
+    # Identical submissions may race, so render under a unique name and move into place
+    temp_path = get_generator().generate(
+        text=processed_text,
+        language=language,
+        style=style,
+        size=size,
+        ink_color=ink_color,
+        output_name=f'{sample_id}_{uuid.uuid4().hex}',
+        progress=progress,
+        output_format=image_format,
+        quality=quality,
+        compress_level=compress_level,
+        dpi=Config.PREVIEW_DPI,
+        seed=seed,
+        render_mode=render_mode
+    )
+    output_path = os.path.join(Config.OUTPUT_FOLDER, f'{sample_id}{os.path.splitext(temp_path)[1]}')
+    os.replace(temp_path, output_path)
+    
+    # Store sample info, keeping everything needed to re-render at full resolution
+    sample_index.put(
+        sample_id,
+        output_path,
+        mimetype=get_generator().encoder.mimetype(image_format),
+        preview_dpi=Config.PREVIEW_DPI,
+        text=text,
+        language=language,
+        style=style,
+        size=size,
+        ink_color=ink_color,
+        image_format=image_format,
+        quality=quality,
+        compress_level=compress_level,
+        seed=seed,
+        render_mode=render_mode
+    )
+    
+    return sample_id
+
+def _full_resolution_path(sample_id, sample):
+    """Return the full-resolution file for a sample, rendering and caching it on first use"""
+    full_path = sample.get('full_path')
+    if full_path and os.path.exists(full_path):
+        return full_path
+    
+    # Document pages and older samples were rendered at full resolution already
+    if not sample.get('preview_dpi'):
+        return sample['path']
+    
+    # Render under a unique name and move into place so concurrent downloads never see a partial file
+    temp_path = get_generator().generate(
+        text=text_processor.process(sample['text'], sample['language']),
+        language=sample['language'],
+        style=sample['style'],
+        size=sample['size'],
+        ink_color=sample['ink_color'],
+        output_name=f'{sample_id}_full_{uuid.uuid4().hex}',
+        output_format=sample.get('image_format', 'png'),
+        quality=sample.get('quality'),
+        compress_level=sample.get('compress_level'),
+        seed=sample.get('seed'),
+        banded=Config.BANDED_RENDERING,
+        render_mode=sample.get('render_mode', 'glyph')
+    )
+    full_path = os.path.join(Config.OUTPUT_FOLDER, f'{sample_id}_full{os.path.splitext(temp_path)[1]}')
+    os.replace(temp_path, full_path)
+    
+    sample_index.set_full_path(sample_id, full_path)
+    return full_path
+
+def _generate_document(chunks, language, style, size, ink_color, output_format, progress=None, render_mode='glyph'):
+    """Render every page of a document as its text is read and register the pages and combined document"""
+    # Generate unique sample ID
+    sample_id = str(uuid.uuid4())
+    
+    # Process text chunk by chunk (translation happens inside generator now)
+    processed_chunks = (text_processor.process(chunk, language) for chunk in chunks)
+    
+    document = get_generator().generate_document_stream(
+        processed_chunks,
+        language=language,
+        style=style,
+        size=size,
+        ink_color=ink_color,
+        sample_id=sample_id,
+        output_format=output_format,
+        progress=progress,
+        render_mode=render_mode
+    )
+    
+    # Each page is a sample of its own so preview/download work per page
+    for page_id, page_path in zip(document['page_ids'], document['page_paths']):
+        sample_index.put(
+            page_id,
+            page_path,
+            language=language,
+            style=style,
+            ink_color=ink_color
+        )
+    
+    # The document sample owns only the combined file; it previews through its first page's sample
+    sample_index.put(
+        sample_id,
+        document['document_path'],
+        document_path=document['document_path'],
+        page_ids=document['page_ids'],
+        language=language,
+        style=style,
+        ink_color=ink_color
+    )
+    
+    return {
+        'success': True,
+        'sample_id': sample_id,
+        'preview_url': f'/api/preview/{sample_id}',
+        'page_ids': document['page_ids'],
+        'page_urls': [f'/api/preview/{page_id}' for page_id in document['page_ids']],
+        'document_url': f'/api/document/{sample_id}'
+    }
+
+def _cache_forever(response):
+    """Mark a response for a sample file as never changing"""
+    response.headers['Cache-Control'] = f'public, max-age={Config.SAMPLE_CACHE_MAX_AGE}, immutable'
+    return response
+
+def _not_modified(etag):
+    """Return a 304 response if the client already holds this representation, else None"""
+    if not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return _cache_forever(response)
+
+def _image_sample(sample_id):
+    """Look up a sample to serve as an image; a document resolves to its first page.
+    
+    Returns (sample id, sample), with sample None if unknown or expired.
+    """
+    sample = sample_index.get(sample_id)
+    if sample and sample['page_ids']:
+        sample_id = sample['page_ids'][0]
+        sample = sample_index.get(sample_id)
+    return sample_id, sample
 
 @app.route('/api/preview/<sample_id>')
 def preview_handwriting(sample_id):
-    if sample_id in generated_samples:
-        return send_file(generated_samples[sample_id]['path'], mimetype='image/png')
+    sample_id, sample = _image_sample(sample_id)
+    if sample and os.path.exists(sample['path']):
+        # A sample id never changes content, so it doubles as a strong ETag
+        etag = f'{sample_id}-preview'
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        return _cache_forever(send_file(sample['path'], mimetype=sample.get('mimetype', 'image/png'), etag=etag))
     return jsonify({'error': 'Sample not found'}), 404
 
 @app.route('/api/download/<sample_id>')
 def download_handwriting(sample_id):
-    if sample_id in generated_samples:
+    sample_id, sample = _image_sample(sample_id)
+    if sample and os.path.exists(sample['path']):
+        # Answered before the full-resolution render, which may not exist yet
+        etag = f'{sample_id}-full'
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        
+        full_path = _full_resolution_path(sample_id, sample)
+        return _cache_forever(send_file(
+            full_path,
+            as_attachment=True,
+            download_name=f'handwriting_{sample_id}{os.path.splitext(full_path)[1]}',
+            mimetype=sample.get('mimetype', 'image/png'),
+            etag=etag
+        ))
+    return jsonify({'error': 'Sample not found'}), 404
+
+@app.route('/api/document/<sample_id>')
+def download_document(sample_id):
+    sample = sample_index.get(sample_id)
+    if sample and sample['document_path'] and os.path.exists(sample['document_path']):
+        document_path = sample['document_path']
+        extension = os.path.splitext(document_path)[1]
         return send_file(
-            generated_samples[sample_id]['path'],
+            document_path,
             as_attachment=True,
-            download_name=f'handwriting_{sample_id}.png',
-            mimetype='image/png'
+            download_name=f'handwriting_{sample_id}{extension}',
+            mimetype='application/pdf' if extension == '.pdf' else 'image/tiff'
         )
-    return jsonify({'error': 'Sample not found'}), 404
+    return jsonify({'error': 'Document not found'}), 404
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of stage latencies, render counters and cache counters"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({'success': True, 'caches': get_generator().cache_stats()})
+
+@app.route('/api/ready', methods=['GET'])
+def get_ready():
+    """Readiness probe: 503 until the warm-up stage has loaded fonts, paper and glyphs"""
+    status = {'ready': ready.is_set(), **startup, 'import_budget_seconds': Config.IMPORT_TIME_BUDGET_MS / 1000}
+    return jsonify(status), 200 if ready.is_set() else 503
 
 @app.route('/api/languages', methods=['GET'])
 def get_languages():
@@ -105,12 +679,17 @@ def get_languages():
 
 @app.route('/api/styles/<language>', methods=['GET'])
 def get_styles(language):
-    styles_map = {
-        'english': ['casual', 'formal', 'print', 'cursive', 'school', 'elegant'],
-        'hindi': ['casual', 'formal', 'traditional', 'school', 'elegant']
-    }
-    styles = styles_map.get(language, ['casual'])
+    styles = list(style_manager.styles.get(language, {})) or ['casual']
     return jsonify({'success': True, 'styles': styles})
 
+# Cold-start cost of everything above; routes, metrics and /api/ready report it
+startup['import_seconds'] = time.perf_counter() - IMPORT_START
+if startup['import_seconds'] * 1000 > Config.IMPORT_TIME_BUDGET_MS:
+    logger.warning("App import took %.0f ms, over the %d ms budget",
+                   startup['import_seconds'] * 1000, Config.IMPORT_TIME_BUDGET_MS)
+
 if __name__ == '__main__':
+    # The reloader's watching process only restarts the server; services run in the child it serves from
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_services()
     app.run(debug=True, port=8000)
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start import time of the Flask app against its budget
+
+Imports app.py in fresh interpreters with warm-up disabled and reports the
+median time the app measures for its own setup, plus the slowest modules
+seen by python -X importtime. Run from the handwriting_backend directory:
+
+    python benchmarks/import_benchmark.py --runs 5
+
+The exit status is 1 when the median exceeds Config.IMPORT_TIME_BUDGET_MS
+(or --budget), so heavy imports creeping back onto the startup path fail
+the check.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import Config
+
+# Printed by the child interpreter once app is imported
+PROBE = 'import json, app; print(json.dumps(app.startup))'
+
+
+def run_import(importtime=False):
+    """Import the app in a new interpreter; returns (import seconds, stderr)"""
+    
+    env = dict(os.environ, WARMUP='0', PYTHONPATH=BACKEND_DIR)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', PROBE]
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    startup = json.loads(result.stdout.strip().splitlines()[-1])
+    return startup['import_seconds'], result.stderr
+
+
+def slowest_modules(importtime_log, count):
+    """Modules imported directly by app, slowest first, as (cumulative ms, name)"""
+    
+    children = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Each nesting level indents by two spaces, and a module is listed after its own imports
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == 'app':
+                return sorted(children, reverse=True)[:count]
+            children = []
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time; the median is reported')
+    parser.add_argument('--budget', type=int, default=Config.IMPORT_TIME_BUDGET_MS, help='Budget in ms')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+    args = parser.parse_args()
+    
+    timings = [run_import()[0] * 1000 for _ in range(args.runs)]
+    median = statistics.median(timings)
+    
+    _, importtime_log = run_import(importtime=True)
+    print(f"{'module':<40}{'ms':>10}")
+    print('-' * 50)
+    for milliseconds, name in slowest_modules(importtime_log, args.top):
+        print(f'{name:<40}{milliseconds:>10.1f}')
+    
+    print(f'\napp import: median {median:.1f} ms over {args.runs} runs '
+          f'(min {min(timings):.1f}, max {max(timings):.1f}), budget {args.budget} ms')
+    if median > args.budget:
+        print(f'Over budget by {median - args.budget:.1f} ms')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-page rendering pipeline stage by stage
+
+Renders a matrix of text lengths x languages x styles x sizes and times the
+stages recorded by utils.metrics: text wrapping, ruled paper creation,
+glyph drawing, ink effects, compositing and PNG encoding. Peak Python memory
+per case is measured with tracemalloc in a separate untimed run. Everything
+runs offline against the bundled fonts. Run from the handwriting_backend directory:
+
+    python benchmarks/render_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/render_benchmark.py --baseline benchmarks/baseline.json --threshold 0.15
+
+With --banded each case is written band by band straight to PNG
+(render_banded_to), the path full-resolution downloads and document pages
+take, instead of being rendered as a whole-page image.
+
+The exit status is 1 when any stage is slower than the baseline by more than
+the threshold, so the suite can gate upgrades.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import PIL
+from models.handwriting_generator import HandwritingGenerator
+from models.style_manager import StyleManager
+from utils import metrics
+
+# Stages reported per case, in pipeline order
+STAGES = ('translate', 'wrap', 'paper', 'glyphs', 'ink', 'composite', 'encode')
+
+# Differences below this are treated as timer noise when comparing against a baseline
+MIN_DELTA_MS = 2.0
+
+# English words the Hindi dictionary knows, so Hindi cases render translated text
+SAMPLE_WORDS = (
+    'hello my friend this is our capstone project using handwriting bot printer with generative ai '
+    'good morning thank you please what is your name where is the school old city new home food water '
+    'the quick brown fox jumps over the lazy dog while we work on one two three four five examples'
+).split()
+
+
+def make_text(words, seed=0):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(SAMPLE_WORDS) for _ in range(words))
+
+
+def build_matrix(lengths, languages, styles, sizes):
+    style_manager = StyleManager()
+    cases = []
+    for language in languages:
+        language_styles = styles or list(style_manager.styles.get(language, {}))
+        for style in language_styles:
+            for size in sizes or list(StyleManager.SIZE_MULTIPLIERS):
+                for words in lengths:
+                    cases.append({'language': language, 'style': style, 'size': size, 'words': words})
+    return cases
+
+
+def case_key(case, banded=False):
+    return f"{case['language']}/{case['style']}/{case['size']}/{case['words']}w" + ('/banded' if banded else '')
+
+
+def render(generator, case, text, dpi, banded=False):
+    """Render one case to an in-memory PNG, whole-page or band by band"""
+    
+    if banded:
+        generator.render_banded_to(io.BytesIO(), text, case['language'], case['style'], case['size'], dpi=dpi)
+    else:
+        generator.render_bytes(text, case['language'], case['style'], case['size'], output_format='png', dpi=dpi)
+
+
+def render_once(generator, case, text, dpi, banded=False):
+    """Render one case and return its stage timings in milliseconds"""
+    
+    metrics.start_collecting()
+    start = time.perf_counter()
+    try:
+        render(generator, case, text, dpi, banded)
+    finally:
+        events = metrics.stop_collecting()
+    total = time.perf_counter() - start
+    
+    stages = dict.fromkeys(STAGES, 0.0)
+    for stage, seconds in events:
+        if stage in stages:
+            stages[stage] += seconds * 1000
+    stages['total'] = total * 1000
+    return stages
+
+
+def peak_memory_kb(generator, case, text, dpi, banded=False):
+    """Peak traced allocation of one render, in KiB"""
+    
+    tracemalloc.start()
+    try:
+        render(generator, case, text, dpi, banded)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(generator, case, repeat, dpi, banded=False):
+    text = make_text(case['words'])
+    
+    # Warm the glyph atlas and font metrics for this font and size
+    render_once(generator, case, text, dpi, banded)
+    
+    runs = [render_once(generator, case, text, dpi, banded) for _ in range(repeat)]
+    result = {name: round(statistics.median(run[name] for run in runs), 3) for name in runs[0]}
+    result['peak_kb'] = round(peak_memory_kb(generator, case, text, dpi, banded), 1)
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Return regressions as (case, stage, baseline_ms, current_ms) tuples"""
+    
+    regressions = []
+    for key, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(key)
+        if previous is None:
+            continue
+        for stage in STAGES + ('total',):
+            before, after = previous.get(stage), current.get(stage)
+            if before is None or after is None:
+                continue
+            if after - before > MIN_DELTA_MS and after > before * (1 + threshold):
+                regressions.append((key, stage, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[50, 300, 1200], help='Text lengths in words')
+    parser.add_argument('--languages', nargs='+', default=['english', 'hindi'])
+    parser.add_argument('--styles', nargs='+', help='Styles to run (default: every style of each language)')
+    parser.add_argument('--sizes', nargs='+', help='Sizes to run (default: every size multiplier)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the median is reported')
+    parser.add_argument('--dpi', type=int, help='Render resolution (default: full 300 DPI)')
+    parser.add_argument('--banded', action='store_true', help='Render band by band straight to PNG')
+    parser.add_argument('--output', help='Write this run\'s results as JSON')
+    parser.add_argument('--baseline', help='Compare against a JSON baseline and fail on regressions')
+    parser.add_argument('--save-baseline', help='Write this run\'s results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Allowed slowdown ratio (0.15 = 15%%)')
+    args = parser.parse_args()
+    
+    generator = HandwritingGenerator()
+    cases = build_matrix(args.lengths, args.languages, args.styles, args.sizes)
+    
+    # Fill the paper template pool so the first cases do not pay for it
+    for _ in range(generator.config.PAPER_TEMPLATE_POOL_SIZE + 1):
+        generator.render('warm up', dpi=args.dpi)
+    
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pillow': PIL.__version__,
+            'numpy': np.__version__,
+            'dpi': args.dpi or generator.config.DPI,
+            'banded': args.banded,
+            'repeat': args.repeat
+        },
+        'cases': {}
+    }
+    
+    header = f"{'case':<40}" + ''.join(f'{stage:>10}' for stage in STAGES + ('total',)) + f"{'peak KiB':>11}"
+    print(header)
+    print('-' * len(header))
+    for case in cases:
+        key = case_key(case, args.banded)
+        result = run_case(generator, case, args.repeat, args.dpi, args.banded)
+        results['cases'][key] = result
+        print(f'{key:<40}' + ''.join(f'{result[stage]:>10.2f}' for stage in STAGES + ('total',))
+              + f"{result['peak_kb']:>11.0f}")
+    print('(stage timings in ms, median of runs)')
+    
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {path}')
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:')
+            for key, stage, before, after in regressions:
+                print(f'  {key:<40} {stage:<10} {before:>9.2f} ms -> {after:>9.2f} ms ({after / before - 1:+.0%})')
+            sys.exit(1)
+        print(f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark English to Hindi translation over multi-page inputs
+
+Times the phrase trie on documents of increasing length; per-page cost
+should stay flat as documents grow. --synthetic pads the dictionary with
+generated phrases to check that lookup cost does not grow with its size.
+Run from the handwriting_backend directory:
+
+    python benchmarks/translation_benchmark.py --pages 1 10 50 --synthetic 50000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.translator import HindiTranslator
+
+# Roughly one handwritten A4 page of text
+WORDS_PER_PAGE = 350
+
+
+def make_document(translator, pages, seed=0):
+    """Build English text mixing dictionary phrases with unknown words"""
+    
+    rng = random.Random(seed)
+    phrases = list(_dictionary_entries(translator))
+    filler = ['the', 'quick', 'brown', 'fox', 'jumps', 'over', 'lazy', 'dog', 'paper', 'ink']
+    
+    words = []
+    while len(words) < pages * WORDS_PER_PAGE:
+        if rng.random() < 0.5:
+            words.extend(rng.choice(phrases)[0].split())
+        else:
+            words.append(rng.choice(filler))
+        if rng.random() < 0.08:
+            words[-1] += rng.choice(['.', ',', '!', '?'])
+    return ' '.join(words)
+
+
+def _dictionary_entries(translator):
+    """Yield (phrase, translation) pairs stored in the translator's trie"""
+    
+    stack = [((), translator.phrases._root)]
+    while stack:
+        words, node = stack.pop()
+        for key, child in node.items():
+            if key is None:
+                yield ' '.join(words), child
+            else:
+                stack.append((words + (key,), child))
+
+
+def best_of(fn, repeat):
+    """Fastest wall time of several runs, in seconds"""
+    
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 20, 50])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--dictionary', help='Tab-separated dictionary to load instead of the default')
+    parser.add_argument('--synthetic', type=int, default=0, help='Add this many generated phrases to the dictionary')
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    translator = HindiTranslator(args.dictionary)
+    load_time = time.perf_counter() - start
+    
+    # Documents are generated before padding so they only draw on real phrases
+    documents = {pages: make_document(translator, pages) for pages in args.pages}
+    
+    rng = random.Random(1)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    for index in range(args.synthetic):
+        words = [''.join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 4))]
+        translator.phrases.add(' '.join(words), f'शब्द{index}')
+    
+    print(f"Dictionary: {translator.phrases.size} phrases, loaded in {load_time * 1000:.1f} ms")
+    print(f"{'pages':>6} {'chars':>9} {'phrases':>8} {'total ms':>9} {'ms/page':>8} {'MB/s':>7}")
+    
+    for pages, text in documents.items():
+        elapsed = best_of(lambda: translator.translate(text), args.repeat)
+        replaced = translator.phrases.translate(text)[1]
+        throughput = len(text.encode('utf-8')) / elapsed / 1e6
+        print(f"{pages:>6} {len(text):>9} {replaced:>8} {elapsed * 1000:>9.2f} "
+              f"{elapsed * 1000 / pages:>8.3f} {throughput:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,8 +6,18 @@ class Config:
     OUTPUT_FOLDER = os.path.join(BASE_DIR, 'outputs')
     FONTS_FOLDER = os.path.join(BASE_DIR, 'fonts')
     TEMPLATES_FOLDER = os.path.join(BASE_DIR, 'templates')
+    DATA_FOLDER = os.path.join(BASE_DIR, 'data')
+    DICTIONARIES_FOLDER = os.path.join(BASE_DIR, 'dictionaries')
+    
+    # Logging - level for the render pipeline's diagnostics (DEBUG shows translated and wrapped text)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    
+    # Startup - background warm-up of fonts, paper and glyphs (0 leaves every cache cold until first use)
+    WARMUP = os.environ.get('WARMUP', '1') == '1'
+    IMPORT_TIME_BUDGET_MS = int(os.environ.get('IMPORT_TIME_BUDGET_MS', 300))  # app import, checked on every start
     
     # A4 paper dimensions at 300 DPI
+    DPI = 300
     A4_WIDTH = 2480  # pixels (210mm at 300dpi)
     A4_HEIGHT = 3508  # pixels (297mm at 300dpi)
     
@@ -18,6 +28,110 @@ class Config:
     MARGIN_TOP = 350   # Good top margin
     MARGIN_BOTTOM = 250  # Good bottom margin
     
+    # Glyph atlas - byte budget for cached character masks
+    GLYPH_CACHE_BYTES = 32 * 1024 * 1024
+    # Jittered copies built per glyph for styles with rotation, slant or baseline variation
+    GLYPH_VARIANTS = int(os.environ.get('GLYPH_VARIANTS', 8))
+    
+    # Word atlas - byte budget for whole-word masks, shared by every request in the process
+    WORD_CACHE_BYTES = int(os.environ.get('WORD_CACHE_BYTES', 64 * 1024 * 1024))
+    # Words pre-rendered at startup from each language's frequency list (0 disables)
+    WORD_PREWARM_COUNT = int(os.environ.get('WORD_PREWARM_COUNT', 300))
+    WORD_PREWARM_LISTS = {
+        'english': os.path.join(DICTIONARIES_FOLDER, 'frequent_words_en.txt'),
+        'hindi': os.path.join(DICTIONARIES_FOLDER, 'frequent_words_hi.txt')
+    }
+    
+    # Stroke engine - base spline fits cached per character (entries, least recently used evicted)
+    STROKE_CACHE_SIZE = 1024
+    # Flattened glyph outlines - one memory-mapped cache file per font
+    OUTLINE_CACHE_FOLDER = os.path.join(DATA_FOLDER, 'outlines')
+    OUTLINE_CURVE_SEGMENTS = 6  # line segments per Bezier curve
+    
+    # Ruled paper templates - pre-built noisy backgrounds per page geometry
+    PAPER_TEMPLATE_POOL_SIZE = 3
+    PAPER_CACHE_BYTES = 128 * 1024 * 1024
+    # Aged paper (styles with 'aged') - stain and yellowing textures per page geometry, as RGB multipliers
+    AGED_TEXTURE_VARIANTS = 2
+    AGED_TEXTURE_BYTES = 64 * 1024 * 1024
+    AGED_TEXTURE_SCALE = 4  # noise is generated at 1/4 of the page resolution, then upsampled
+    
+    # Output encoding - formats, PNG compression 0-9 (lower is faster), palette size, lossy qualities 1-100
+    IMAGE_FORMATS = ('png', 'png8', 'webp', 'jpeg', 'jpg')
+    PNG_COMPRESS_LEVEL = 6  # files kept for download: full-resolution pages and documents
+    PNG_FAST_COMPRESS_LEVEL = 1  # previews and streamed responses, where encoding is on the request path
+    PNG_PALETTE_COLORS = 16
+    WEBP_QUALITY = 80
+    JPEG_QUALITY = 85
+    
+    # Translation - English to Hindi phrase dictionary (tab-separated, loaded once)
+    HINDI_DICTIONARY_PATH = os.environ.get('HINDI_DICTIONARY_PATH', os.path.join(DICTIONARIES_FOLDER, 'en_hi.tsv'))
+    
+    # Preview tier - on-screen previews render the same layout at a lower DPI
+    PREVIEW_DPI = 96
+    # Lowest DPI /api/render accepts; the highest is the full-resolution DPI
+    MIN_RENDER_DPI = 50
+    
+    # Ink effects - per pen type bank of seamless texture tiles, sampled only where there is ink
+    INK_EFFECTS = os.environ.get('INK_EFFECTS', '1') == '1'
+    INK_TEXTURE_TILE = 256  # tile side in pixels
+    INK_TEXTURE_TILES = 4  # tiles per pen type; lines take turns
+    INK_TEXTURE_SEED = 7
+    
+    # Banded rendering - full-resolution PNGs are built and encoded in horizontal strips
+    BANDED_RENDERING = os.environ.get('BANDED_RENDERING', '1') == '1'
+    BAND_HEIGHT = int(os.environ.get('BAND_HEIGHT', 256))  # rows; lowered to fit the budget below
+    BAND_MEMORY_BUDGET = int(os.environ.get('BAND_MEMORY_BUDGET', 16 * 1024 * 1024))  # bytes of band working memory
+    
+    # Render modes - 'glyph' blits cached font glyphs; 'stroke' draws pen strokes with width and opacity dynamics
+    RENDER_MODES = ('glyph', 'stroke')
+    
+    # Multi-page documents - worker processes used to render pages in parallel
+    PAGE_WORKERS = int(os.environ.get('PAGE_WORKERS', os.cpu_count() or 1))
+    
+    # Uploads - spooled to UPLOAD_FOLDER and read incrementally, with hard caps
+    UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 20 * 1024 * 1024))
+    UPLOAD_MAX_PAGES = int(os.environ.get('UPLOAD_MAX_PAGES', 500))
+    UPLOAD_MAX_CHARS = int(os.environ.get('UPLOAD_MAX_CHARS', 1000000))
+    INGEST_CHUNK_CHARS = 4000  # characters per chunk for DOCX and text files
+    
+    # Batch generation - threads sharing one generator and its caches
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+    BATCH_MAX_ITEMS = 500
+    
+    # Render job queue - persistent sqlite queue drained by worker threads
+    JOB_DB_PATH = os.path.join(DATA_FOLDER, 'jobs.db')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_QUEUE_MAX = int(os.environ.get('JOB_QUEUE_MAX', 100))
+    JOB_POLL_INTERVAL = 1.0  # seconds
+    JOB_RETRY_AFTER = 5  # seconds suggested to clients when the queue is full
+    
+    # Sample index - shared sqlite index of outputs with TTL and disk cap
+    SAMPLE_DB_PATH = os.path.join(DATA_FOLDER, 'samples.db')
+    SAMPLE_TTL = int(os.environ.get('SAMPLE_TTL', 24 * 60 * 60))  # seconds
+    OUTPUT_MAX_BYTES = int(os.environ.get('OUTPUT_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+    SAMPLE_GC_INTERVAL = 300  # seconds between background GC runs
+    # Finished and failed jobs are kept as long as the samples their results point to
+    JOB_RETENTION = SAMPLE_TTL  # seconds
+    
+    # Result cache - single-page samples are named by a hash of their inputs and seed
+    RENDER_VERSION = 5  # bump when rendering output changes so cached samples are not reused
+    SAMPLE_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # seconds; content-addressed files never change
+    
     # Create directories
-    for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER, FONTS_FOLDER, TEMPLATES_FOLDER]:
-        os.makedirs(folder, exist_ok=True)
\ No newline at end of file
+    for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER, FONTS_FOLDER, TEMPLATES_FOLDER, DATA_FOLDER]:
+        os.makedirs(folder, exist_ok=True)
+
+
+class PageGeometry:
+    """A4 page geometry scaled from the 300 DPI base layout to a target DPI"""
+    
+    def __init__(self, dpi=None):
+        self.dpi = dpi or Config.DPI
+        self.scale = self.dpi / Config.DPI
+        self.width = self.px(Config.A4_WIDTH)
+        self.height = self.px(Config.A4_HEIGHT)
+    
+    def px(self, value):
+        """Convert a base (300 DPI) coordinate to pixels at this DPI"""
+        return int(round(value * self.scale))
\ No newline at end of file
@@ -1,5 +1,18 @@
-from .handwriting_generator import HandwritingGenerator
-from .text_processor import TextProcessor
-from .style_manager import StyleManager
+import importlib
 
-__all__ = ['HandwritingGenerator', 'TextProcessor', 'StyleManager']
\ No newline at end of file
+# Models are imported on first use, so importing the text processor does not
+# load the rendering stack (NumPy, Pillow, OpenCV)
+_EXPORTS = {
+    'HandwritingGenerator': 'handwriting_generator',
+    'TextProcessor': 'text_processor',
+    'StyleManager': 'style_manager'
+}
+
+__all__ = ['HandwritingGenerator', 'TextProcessor', 'StyleManager']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
\ No newline at end of file
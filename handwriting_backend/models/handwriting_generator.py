@@ -1,31 +1,352 @@
 import os
+import time
+import string
+import logging
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
-import random
-import math
-from config import Config
+from PIL import Image
+from config import Config, PageGeometry
 from utils.image_utils import ImageUtils
 from utils.paper_generator import PaperGenerator
+from utils.glyph_atlas import Glyph, GlyphAtlas
+from utils.word_atlas import WordAtlas, ShapedWord, load_frequency_list
+from utils.image_encoder import ImageEncoder, PNGBandWriter
+from utils.font_metrics import FontMetrics
+from utils.compositor import CoverageMask, InkCompositor
+from utils.stroke_raster import StrokeRasterizer
+from utils.ink_effects import InkEffects
+from utils import metrics
 from models.style_manager import StyleManager
-import cv2
-from perlin_noise import PerlinNoise
+from models.translator import HindiTranslator
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Process pool for multi-page documents, created on first use
+_page_pool = None
+_page_pool_workers = 0
+
+# Per-process generator used by page workers so caches survive between pages
+_worker_generator = None
+
+
+def _get_page_pool(workers):
+    """Return the shared page-rendering process pool"""
+    global _page_pool, _page_pool_workers
+    if _page_pool is None or _page_pool_workers != workers:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False)
+        # Spawned workers avoid inheriting locks held by the web server's threads
+        _page_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _page_pool_workers = workers
+    return _page_pool
+
+
+def _render_page_job(job):
+    """Render a single page inside a worker process"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = HandwritingGenerator()
+    
+    # Stage timings are returned so the parent process can record them
+    metrics.start_collecting()
+    try:
+        output_path = _worker_generator._render_page_to_file(*job)
+    finally:
+        stage_events = metrics.stop_collecting()
+    return output_path, stage_events
+
 
 class HandwritingGenerator:
+    # Scripts whose conjuncts and matras need word-level shaping instead of per-codepoint glyphs
+    SHAPED_LANGUAGES = ('hindi',)
+    # Working bytes per RGB sample of a band: paper and output rows plus float32 pixels and noise
+    BAND_BYTES_PER_SAMPLE = 10
+    RENDER_MODES = Config.RENDER_MODES
+    # Pen dynamics of stroke rendering, with widths in 300 DPI pixels
+    STROKE_PEN = {'base_width': 2.5, 'width_range': (0.8, 1.2), 'opacity': 0.95}
+    
     def __init__(self):
         self.config = Config()
         self.paper_generator = PaperGenerator()
         self.style_manager = StyleManager()
         self.image_utils = ImageUtils()
+        self.glyph_atlas = GlyphAtlas()
+        self.word_atlas = WordAtlas()
+        self.encoder = ImageEncoder()
+        self.font_metrics = FontMetrics()
+        self.compositor = InkCompositor()
+        self.translator = HindiTranslator()
+        self.stroke_rasterizer = StrokeRasterizer()
+        self.ink_effects = InkEffects(self.style_manager.get_pen_characteristics)
+        # Built on first use: it maps every font's outline cache
+        self._stroke_engine = None
         
-    def generate(self, text, language='english', style='casual', size='medium', ink_color='#000000', sample_id=None):
-        """Generate realistic handwriting on A4 ruled paper with custom ink color"""
+    @property
+    def stroke_engine(self):
+        """AdvancedHandwritingGenerator used by the stroke render mode"""
         
-        # Create A4 ruled paper background
-        paper = self.paper_generator.create_ruled_paper()
+        if self._stroke_engine is None:
+            from models.handwriting_generator_advanced import AdvancedHandwritingGenerator
+            self._stroke_engine = AdvancedHandwritingGenerator()
+        return self._stroke_engine
+    
+    def cache_stats(self):
+        """Return hit/miss counters for the rendering caches"""
+        return {
+            'glyph_atlas': self.glyph_atlas.stats(),
+            'word_atlas': self.word_atlas.stats(),
+            'paper_templates': self.paper_generator.template_cache.stats(),
+            'aging_textures': self.paper_generator.aging_cache.stats()
+        }
+    
+    def prewarm_word_cache(self, count=None):
+        """Pre-render each language's most frequent words for every style at full and preview DPI"""
+        
+        count = self.config.WORD_PREWARM_COUNT if count is None else count
+        if count <= 0:
+            return 0
+        
+        start = time.perf_counter()
+        added = 0
+        for language, path in self.config.WORD_PREWARM_LISTS.items():
+            if not os.path.exists(path):
+                logger.warning("Word frequency list not found: %s", path)
+                continue
+            words = load_frequency_list(path, count)
+            for style, params in self.style_manager.styles.get(language, {}).items():
+                # Jittered styles cache each word once per variant; their glyph variants are warmed instead
+                if language not in self.SHAPED_LANGUAGES and self.style_manager.jitter(params):
+                    continue
+                for dpi in (None, self.config.PREVIEW_DPI):
+                    added += self._prewarm_words(words, language, style, 'medium', dpi)
         
-        # Create drawing context with transparency
-        overlay = Image.new('RGBA', (self.config.A4_WIDTH, self.config.A4_HEIGHT), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(overlay)
+        logger.info("Pre-warmed %d word masks in %.2f s", added, time.perf_counter() - start)
+        return added
+    
+    def prewarm_glyph_variants(self, characters=None):
+        """Build the jittered glyph variants of every jittered style at full and preview DPI; returns glyphs built"""
+        
+        characters = characters or string.ascii_letters + string.digits + string.punctuation
+        start = time.perf_counter()
+        built = 0
+        for language, styles in self.style_manager.styles.items():
+            if language in self.SHAPED_LANGUAGES:
+                continue
+            for style, params in styles.items():
+                if not self.style_manager.jitter(params):
+                    continue
+                font_path = self.style_manager.get_font_path(language, style)
+                for dpi in (None, self.config.PREVIEW_DPI):
+                    draw_params = self._draw_params(self.style_manager.get_style_params(language, style, 'medium'),
+                                                    PageGeometry(dpi))
+                    jitter = self.style_manager.jitter(draw_params)
+                    for char in characters:
+                        if self.glyph_atlas.get_variants(font_path, draw_params['font_size'], char, jitter):
+                            built += 1
+        
+        logger.info("Built jittered variants of %d glyphs in %.2f s", built, time.perf_counter() - start)
+        return built
+    
+    def warm_up(self, characters=None):
+        """Load every style's fonts, the ruled paper pools and common glyphs at full and preview DPI.
+        
+        Meant to run before the app reports ready, so the first request does
+        not pay for font parsing, paper noise or glyph rasterization.
+        Returns the seconds taken.
+        """
+        
+        characters = characters or string.ascii_letters + string.digits + string.punctuation
+        start = time.perf_counter()
+        
+        for dpi in (self.config.PREVIEW_DPI, None):
+            geometry = PageGeometry(dpi)
+            # Every slot of the pool, so any seed finds its paper ready
+            for slot in range(self.paper_generator.template_cache.pool_size):
+                self.paper_generator.create_ruled_paper(geometry=geometry, seed=slot)
+            
+            for language, styles in self.style_manager.styles.items():
+                for style in styles:
+                    style_params = self.style_manager.get_style_params(language, style, 'medium')
+                    font_path = self.style_manager.get_font_path(language, style)
+                    font_size = self._draw_params(style_params, geometry)['font_size']
+                    self.font_metrics.table(font_path)
+                    if language in self.SHAPED_LANGUAGES:
+                        self.word_atlas.get_font(font_path, font_size)
+                    else:
+                        for char in characters:
+                            self.glyph_atlas.get_glyph(font_path, font_size, char)
+        
+        for styles in self.style_manager.styles.values():
+            for style_params in styles.values():
+                self.ink_effects.bank(style_params.get('pen_type', 'ink'))
+        
+        seconds = time.perf_counter() - start
+        logger.info("Warm-up loaded fonts, paper and glyphs in %.2f s", seconds)
+        return seconds
+    
+    def prewarm_caches(self):
+        """Fill the glyph variant and word caches ahead of traffic"""
+        
+        self.prewarm_glyph_variants()
+        self.prewarm_word_cache()
+    
+    def _prewarm_words(self, words, language, style, size, dpi):
+        style_params = self.style_manager.get_style_params(language, style, size)
+        geometry = PageGeometry(dpi)
+        draw_params = self._draw_params(style_params, geometry)
+        font_path = self.style_manager.get_font_path(language, style)
+        font_table = self.font_metrics.table(font_path)
+        
+        # Words go through the same path as a rendered line, into a mask that is thrown away
+        def render_word(word):
+            self._draw_words(CoverageMask(), word, 0, 0, style_params, draw_params, language, font_path,
+                             font_table, geometry)
+        
+        return self.word_atlas.prewarm(words, render_word)
+    
+    def generate(self, text, language='english', style='casual', size='medium', ink_color='#000000', sample_id=None,
+                 progress=None, output_format='png', quality=None, compress_level=None, dpi=None, output_name=None,
+                 seed=None, banded=False, render_mode='glyph'):
+        """Generate realistic handwriting on A4 ruled paper with custom ink color.
+        
+        With banded=True a PNG is rendered and written in horizontal bands to bound peak memory.
+        Previews (below full DPI) default to the fast PNG compression level.
+        """
+        
+        if compress_level is None and dpi and dpi < self.config.DPI:
+            compress_level = self.config.PNG_FAST_COMPRESS_LEVEL
+        extension = self.encoder.extension(output_format)
+        output_path = os.path.join(self.config.OUTPUT_FOLDER, f'{output_name or sample_id}.{extension}')
+        
+        if banded and self.encoder.normalize_format(output_format) == 'png':
+            with open(output_path, 'wb') as f:
+                self.render_banded_to(f, text, language, style, size, ink_color, progress=progress, dpi=dpi,
+                                      seed=seed, compress_level=compress_level, render_mode=render_mode)
+            return output_path
+        
+        final_image = self.render(text, language, style, size, ink_color, progress=progress, dpi=dpi, seed=seed,
+                                  render_mode=render_mode)
+        
+        # Save the image
+        with metrics.timed('encode'):
+            self.encoder.encode_to(final_image, output_path, output_format, quality=quality,
+                                   compress_level=compress_level, dpi=dpi)
+        
+        return output_path
+    
+    def render(self, text, language='english', style='casual', size='medium', ink_color='#000000', progress=None,
+               dpi=None, seed=None, render_mode='glyph'):
+        """Render the first page of handwriting and return it as an image without saving.
+        
+        Rendering is deterministic for a given seed, so equal inputs give byte-identical output.
+        """
+        
+        style_params, ink_rgb, lines = self._prepare(text, language, style, size, ink_color)
+        
+        # Single-page mode keeps only the lines that fit on the first page
+        page_lines = lines[:self._lines_per_page()]
+        self._count_rendered([page_lines])
+        return self._render_page(page_lines, style_params, language, ink_rgb, progress=progress, dpi=dpi, seed=seed,
+                                 render_mode=render_mode)
+    
+    def render_banded_to(self, fp, text, language='english', style='casual', size='medium', ink_color='#000000',
+                         progress=None, dpi=None, seed=None, compress_level=None, band_height=None,
+                         render_mode='glyph'):
+        """Render the first page as a PNG written to fp band by band, identical in pixels to render()"""
+        
+        style_params, ink_rgb, lines = self._prepare(text, language, style, size, ink_color)
+        page_lines = lines[:self._lines_per_page()]
+        self._count_rendered([page_lines])
+        self._render_page_banded(fp, page_lines, style_params, language, ink_rgb, progress=progress, dpi=dpi,
+                                 seed=seed, compress_level=compress_level, band_height=band_height,
+                                 render_mode=render_mode)
+    
+    def render_bytes(self, text, language='english', style='casual', size='medium', ink_color='#000000',
+                     output_format='png', quality=None, compress_level=None, dpi=None, seed=None,
+                     render_mode='glyph'):
+        """Render the first page straight into an in-memory buffer; returns (buffer, mimetype)"""
+        
+        # Streamed responses are encoded while the client waits, so PNGs default to the fast level
+        if compress_level is None:
+            compress_level = self.config.PNG_FAST_COMPRESS_LEVEL
+        image = self.render(text, language, style, size, ink_color, dpi=dpi, seed=seed, render_mode=render_mode)
+        with metrics.timed('encode'):
+            return self.encoder.encode(image, output_format, quality=quality, compress_level=compress_level, dpi=dpi)
+    
+    def generate_document(self, text, language='english', style='casual', size='medium', ink_color='#000000',
+                          sample_id=None, output_format='pdf', workers=None, progress=None, render_mode='glyph'):
+        """Lay out text over as many pages as needed and render them in parallel"""
+        
+        return self.generate_document_stream([text], language, style, size, ink_color, sample_id=sample_id,
+                                             output_format=output_format, workers=workers, progress=progress,
+                                             render_mode=render_mode)
+    
+    def generate_document_stream(self, chunks, language='english', style='casual', size='medium',
+                                 ink_color='#000000', sample_id=None, output_format='pdf', workers=None,
+                                 progress=None, render_mode='glyph'):
+        """Render a document from an iterable of text chunks, starting each page as soon as it is laid out"""
+        
+        style_params = self.style_manager.get_style_params(language, style, size)
+        ink_rgb = self._hex_to_rgb(ink_color)
+        workers = workers or self.config.PAGE_WORKERS
+        
+        page_ids = []
+        page_paths = []
+        results = []
+        held_job = None
+        
+        for page_num, page_lines in enumerate(self._layout_pages(chunks, style_params, language), 1):
+            page_id = f'{sample_id}_p{page_num}'
+            page_path = os.path.join(self.config.OUTPUT_FOLDER, f'{page_id}.png')
+            page_ids.append(page_id)
+            page_paths.append(page_path)
+            self._count_rendered([page_lines])
+            job = (page_lines, style_params, language, ink_rgb, page_path, render_mode)
+            
+            if workers <= 1:
+                results.append((self._render_page_to_file(*job), ()))
+            elif page_num == 1:
+                # Single-page documents render in-process; wait for page 2 before using the pool
+                held_job = job
+            else:
+                # Each worker process keeps its own generator and caches between pages
+                pool = _get_page_pool(workers)
+                if held_job is not None:
+                    results.append(pool.submit(_render_page_job, held_job))
+                    held_job = None
+                results.append(pool.submit(_render_page_job, job))
+        
+        if held_job is not None:
+            results.append((self._render_page_to_file(*held_job), ()))
+        
+        for page_num, result in enumerate(results, 1):
+            _, stage_events = result if isinstance(result, tuple) else result.result()
+            # Stages timed inside page workers are recorded in this process
+            for stage, seconds in stage_events:
+                metrics.observe_stage(stage, seconds)
+            if progress:
+                progress(page_num / (len(results) + 1))
+        
+        with metrics.timed('encode'):
+            document_path = self._save_document(page_paths, sample_id, output_format)
+        if progress:
+            progress(1.0)
+        
+        return {
+            'page_ids': page_ids,
+            'page_paths': page_paths,
+            'document_path': document_path
+        }
+    
+    def layout_pages(self, chunks, language='english', style='casual', size='medium'):
+        """Yield the wrapped lines of each page as soon as enough text chunks have been read"""
+        
+        style_params = self.style_manager.get_style_params(language, style, size)
+        return self._layout_pages(chunks, style_params, language)
+    
+    def _prepare(self, text, language, style, size, ink_color):
+        """Resolve style and ink colour, translate if needed and wrap text into lines"""
         
         # Get style parameters
         style_params = self.style_manager.get_style_params(language, style, size)
@@ -35,58 +356,288 @@ class HandwritingGenerator:
         
         # Translate text if language is Hindi and text is in English
         if language == 'hindi':
-            text = self._translate_to_hindi(text)
-            print(f"Translated text: {text}")  # Debug print
+            with metrics.timed('translate'):
+                text = self._translate_to_hindi(text)
+            logger.debug("Translated text: %s", text)
         
         # Split text into lines with proper word wrapping
-        lines = self._wrap_text(text, style_params)
-        print(f"Lines after wrapping: {lines}")  # Debug print
+        with metrics.timed('wrap'):
+            lines = self._wrap_text(text, style_params, language)
+        logger.debug("Lines after wrapping: %s", lines)
+        
+        return style_params, ink_rgb, lines
+    
+    def _layout_pages(self, chunks, style_params, language):
+        """Incremental layout: wrap chunks as they arrive and yield each page once it is full"""
+        
+        per_page = self._lines_per_page()
+        lines = []
+        carry = ''
+        emitted = False
+        
+        # A Hindi document with no dictionary phrase at all is replaced by the fallback
+        # text, so its pages are held back until the first phrase is found
+        held = language == 'hindi'
+        pieces = self._translate_chunks(chunks) if held else ((chunk, 0, 0) for chunk in chunks)
+        replaced = words = 0
+        
+        for chunk, replaced, words in pieces:
+            # The last line may still grow with the next chunk's words, so it is carried over
+            with metrics.timed('wrap'):
+                wrapped = self._wrap_text(f'{carry} {chunk}'.strip(), style_params, language)
+            carry = wrapped.pop() if wrapped else ''
+            lines.extend(wrapped)
+            held = held and not replaced
+            
+            while not held and len(lines) >= per_page:
+                yield lines[:per_page]
+                lines = lines[per_page:]
+                emitted = True
+        
+        if held:
+            with metrics.timed('wrap'):
+                lines = self._wrap_text(self.translator.fallback(words), style_params, language)
+            carry = ''
+        if carry:
+            lines.append(carry)
+        for start in range(0, len(lines), per_page):
+            yield lines[start:start + per_page]
+            emitted = True
+        
+        if not emitted:
+            yield []
+    
+    def _translate_chunks(self, chunks):
+        """Translate chunks to Hindi as they arrive.
+        
+        Yields (translated text, phrases replaced so far, words read so far).
+        The last words of each chunk are translated with the next one, so a
+        phrase split across chunks is found as in the whole text.
+        """
+        
+        phrases = self.translator.phrases
+        pending = ''
+        replaced = words = 0
+        for chunk in chunks:
+            words += len(chunk.split())
+            with metrics.timed('translate'):
+                translated, pending, count = phrases.translate_partial(f'{pending} {chunk}')
+            replaced += count
+            yield translated, replaced, words
+        
+        with metrics.timed('translate'):
+            translated, count = phrases.translate(pending)
+        yield translated, replaced + count, words
+    
+    def _count_rendered(self, pages):
+        """Update the page and character counters for pages about to be rendered"""
+        
+        metrics.PAGES_RENDERED.inc(len(pages))
+        metrics.CHARACTERS_RENDERED.inc(sum(len(line) - line.count(' ') for lines in pages for line in lines))
+    
+    def _lines_per_page(self):
+        """Number of text lines that fit between the top and bottom margins"""
+        
+        first_line_y = self.config.MARGIN_TOP + 50
+        last_line_y = self.config.A4_HEIGHT - self.config.MARGIN_BOTTOM
+        return max(1, (last_line_y - first_line_y) // self.config.LINE_HEIGHT + 1)
+    
+    def _render_page(self, lines, style_params, language, ink_rgb, progress=None, dpi=None, seed=None,
+                     render_mode='glyph'):
+        """Render one page worth of lines onto ruled paper"""
+        
+        # Layout is computed in base (300 DPI) units and scaled when drawing,
+        # so previews and full renders place every character identically
+        geometry = PageGeometry(dpi)
+        
+        # Create A4 ruled paper background
+        with metrics.timed('paper'):
+            paper = self.paper_generator.create_ruled_paper(geometry=geometry, seed=seed,
+                                                            aged=style_params.get('aged', False))
+        
+        # Compositing time is summed over the page and recorded once
+        composite_seconds = 0.0
+        for rendered in self._line_coverages(lines, style_params, language, geometry, progress, seed, render_mode):
+            # Ink the line in one blend restricted to its inked bounding box
+            composite_start = time.perf_counter()
+            self.compositor.composite_coverage(paper, rendered, ink_rgb)
+            composite_seconds += time.perf_counter() - composite_start
+        
+        metrics.observe_stage('composite', composite_seconds)
+        
+        # Apply final post-processing for clear output
+        with metrics.timed('post_process'):
+            return self._post_process(paper)
+    
+    def _render_page_banded(self, fp, lines, style_params, language, ink_rgb, progress=None, dpi=None, seed=None,
+                            compress_level=None, band_height=None, render_mode='glyph'):
+        """Render one page as PNG into fp, producing, inking and encoding it one horizontal band at a time.
+        
+        Only one band of paper and the coverage of the lines crossing it are
+        held at once. The pixels match _render_page() with the same seed.
+        """
+        
+        geometry = PageGeometry(dpi)
+        band_height = band_height or self._band_height(geometry)
+        writer = PNGBandWriter(fp, geometry.width, geometry.height, dpi=geometry.dpi, compress_level=compress_level)
+        
+        coverages = self._line_coverages(lines, style_params, language, geometry, progress, seed, render_mode)
+        bands = self.paper_generator.ruled_paper_bands(geometry, band_height, variant=seed,
+                                                       aged=style_params.get('aged', False))
+        pending = []
+        more_lines = True
+        paper_seconds = composite_seconds = encode_seconds = 0.0
+        
+        while True:
+            start = time.perf_counter()
+            band_top, band = next(bands, (None, None))
+            paper_seconds += time.perf_counter() - start
+            if band is None:
+                break
+            band_bottom = band_top + band.shape[0]
+            
+            # Lines run top to bottom, so stop pulling once one starts below this band
+            while more_lines and (not pending or pending[-1][2] < band_bottom):
+                rendered = next(coverages, None)
+                if rendered is None:
+                    more_lines = False
+                else:
+                    pending.append(rendered)
+            # Lines that end above the band are finished
+            pending = [rendered for rendered in pending if rendered[2] + rendered[0].shape[0] > band_top]
+            
+            start = time.perf_counter()
+            for rendered in pending:
+                self.compositor.composite_band(band, band_top, rendered, ink_rgb)
+            composite_seconds += time.perf_counter() - start
+            
+            start = time.perf_counter()
+            writer.write(band)
+            encode_seconds += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        writer.close()
+        encode_seconds += time.perf_counter() - start
+        
+        metrics.observe_stage('paper', paper_seconds)
+        metrics.observe_stage('composite', composite_seconds)
+        metrics.observe_stage('encode', encode_seconds)
+    
+    def _band_height(self, geometry):
+        """Rows per band: the configured height, lowered so a band's working arrays fit the memory budget"""
+        
+        row_bytes = geometry.width * 3 * self.BAND_BYTES_PER_SAMPLE
+        return max(1, min(self.config.BAND_HEIGHT, self.config.BAND_MEMORY_BUDGET // row_bytes))
+    
+    def _line_coverages(self, lines, style_params, language, geometry, progress=None, seed=None, render_mode='glyph'):
+        """Yield the ink coverage of each inked line as (mask, left, top) in page pixels, top to bottom"""
+        
+        # Complex scripts need shaped glyphs, which the per-codepoint stroke engine cannot draw
+        strokes = render_mode == 'stroke' and language not in self.SHAPED_LANGUAGES
+        # Stroke noise and glyph variant choices follow the render seed
+        rng = np.random.default_rng(seed)
+        
+        draw_params = self._draw_params(style_params, geometry)
         
         # Starting position - proper spacing from pink margin line
         x_start = self.config.MARGIN_LEFT + 30  # 30px spacing from pink margin line
         y_current = self.config.MARGIN_TOP + 50  # Proper spacing from top
         
-        # Process each line
-        for line_idx, line in enumerate(lines):
-            if y_current > self.config.A4_HEIGHT - self.config.MARGIN_BOTTOM:
-                break
+        # Pen advances come from the font's metrics; the baseline sits half an
+        # x-height below the line centre so lowercase letters stay centred
+        font_path = self.style_manager.get_font_path(language, style_params['style'])
+        font_table = self.font_metrics.table(font_path)
+        baseline_offset = 0
+        if font_table:
+            baseline_offset = font_table.x_height / font_table.units_per_em * style_params['font_size'] / 2
+        
+        # Glyph and ink effect times are summed over the page and recorded once
+        glyph_seconds = 0.0
+        ink_seconds = 0.0
+        try:
+            # Process each line
+            for line_idx, line in enumerate(lines):
+                if y_current > self.config.A4_HEIGHT - self.config.MARGIN_BOTTOM:
+                    break
                 
-            # Reset x position for new line
-            x_current = x_start
-            
-            # Process each character in the line
-            for char_idx, char in enumerate(line):
-                if char == ' ':
-                    # Handle spaces
-                    x_current += style_params['word_spacing']
-                    continue
-                    
-                # Draw character with consistent baseline
-                self._draw_character(
-                    draw, char, x_current, y_current, 
-                    style_params, language, ink_rgb
-                )
+                # Glyphs of a line are gathered into one coverage mask
+                line_start = time.perf_counter()
+                line_mask = CoverageMask()
                 
-                # Update x position
-                x_current += style_params['char_spacing']
-            
-            # Move to next line
-            y_current += self.config.LINE_HEIGHT
+                if strokes:
+                    # The whole line's pen strokes are rasterized in one batch
+                    self._draw_strokes(line_mask, line, x_start, y_current + baseline_offset,
+                                       style_params, draw_params, font_path, font_table, geometry, rng)
+                else:
+                    # Each word is one cached mask, composed or shaped on first use
+                    self._draw_words(line_mask, line, x_start, y_current + baseline_offset,
+                                     style_params, draw_params, language, font_path, font_table, geometry, rng)
+                rendered = line_mask.render(geometry.width, geometry.height)
+                glyph_seconds += time.perf_counter() - line_start
+                
+                if self.config.INK_EFFECTS and rendered is not None:
+                    ink_start = time.perf_counter()
+                    rendered = self.ink_effects.apply(rendered, style_params.get('pen_type', 'ink'), line_idx)
+                    ink_seconds += time.perf_counter() - ink_start
+                
+                # Move to next line
+                y_current += self.config.LINE_HEIGHT
+                
+                if progress:
+                    progress((line_idx + 1) / len(lines))
+                
+                if rendered is not None:
+                    yield rendered
+        finally:
+            metrics.observe_stage('glyphs', glyph_seconds)
+            metrics.observe_stage('ink', ink_seconds)
+    
+    def _render_page_to_file(self, lines, style_params, language, ink_rgb, output_path, render_mode='glyph'):
+        """Render one page and save it as a PNG"""
         
-        # Composite onto paper
-        paper.paste(overlay, (0, 0), overlay)
+        if self.config.BANDED_RENDERING:
+            with open(output_path, 'wb') as f:
+                self._render_page_banded(f, lines, style_params, language, ink_rgb, render_mode=render_mode)
+            return output_path
         
-        # Apply final post-processing for clear output
-        final_image = self._post_process(paper)
+        page = self._render_page(lines, style_params, language, ink_rgb, render_mode=render_mode)
+        with metrics.timed('encode'):
+            self.encoder.encode_to(page, output_path, 'png')
+        return output_path
+    
+    def _save_document(self, page_paths, sample_id, output_format):
+        """Combine rendered pages into a single multi-page PDF or TIFF"""
         
-        # Save the image
-        output_path = os.path.join(self.config.OUTPUT_FOLDER, f'{sample_id}.png')
-        final_image.save(output_path, 'PNG', dpi=(300, 300))
+        output_format = output_format.lower()
+        if output_format not in ('pdf', 'tiff'):
+            output_format = 'pdf'
         
-        return output_path
+        document_path = os.path.join(self.config.OUTPUT_FOLDER, f'{sample_id}.{output_format}')
+        pages = [Image.open(path) for path in page_paths]
+        try:
+            if output_format == 'pdf':
+                pages[0].save(document_path, 'PDF', save_all=True, append_images=pages[1:], resolution=300)
+            else:
+                pages[0].save(document_path, 'TIFF', save_all=True, append_images=pages[1:],
+                              compression='tiff_deflate', dpi=(300, 300))
+        finally:
+            for page in pages:
+                page.close()
+        
+        return document_path
     
-    def _wrap_text(self, text, style_params):
-        """Wrap text to fit within page margins"""
+    def _draw_params(self, style_params, geometry):
+        """Style parameters with pixel sizes converted to the page resolution"""
+        
+        return dict(style_params, font_size=max(1, geometry.px(style_params['font_size'])),
+                    baseline_var=style_params.get('baseline_var', 0) * geometry.scale)
+    
+    def _tracking(self, style_params):
+        """Extra space between letters on top of the font's own advance widths"""
+        return style_params['char_spacing'] - style_params['char_width']
+    
+    def _wrap_text(self, text, style_params, language='english'):
+        """Wrap text to fit within page margins using measured word widths"""
         words = text.split()
         lines = []
         current_line = []
@@ -95,9 +646,21 @@ class HandwritingGenerator:
         # Calculate max width with reduced right margin
         max_width = self.config.A4_WIDTH - (self.config.MARGIN_LEFT + self.config.MARGIN_RIGHT + 60)
         
-        for word in words:
-            # Estimate word width
-            word_width = len(word) * style_params['char_spacing'] + style_params['word_spacing']
+        # Measure all words in one pass over the font's advance tables;
+        # shaped scripts use the shaped advance of each whole word instead
+        font_path = self.style_manager.get_font_path(language, style_params['style'])
+        if language in self.SHAPED_LANGUAGES:
+            word_widths = [self.word_atlas.advance(font_path, style_params['font_size'], word) for word in words]
+        else:
+            word_widths = self.font_metrics.word_widths(
+                words, font_path, style_params['font_size'], tracking=self._tracking(style_params)
+            )
+        if word_widths is None:
+            # Fixed-pitch estimate when the font has no usable metrics
+            word_widths = [len(word) * style_params['char_spacing'] for word in words]
+        
+        for word, width in zip(words, word_widths):
+            word_width = width + style_params['word_spacing']
             
             if current_width + word_width <= max_width or not current_line:
                 current_line.append(word)
@@ -113,101 +676,8 @@ class HandwritingGenerator:
         return lines if lines else [text]
     
     def _translate_to_hindi(self, text):
-        """Translate English text to Hindi using comprehensive mapping"""
-        if not text or not text.strip():
-            return "हिंदी में स्वागत है"
-            
-        text = text.strip()
-        print(f"Original text for translation: '{text}'")  # Debug print
-        
-        # Comprehensive English to Hindi translation mapping
-        translation_map = {
-            # Basic greetings and common words
-            'hello': 'नमस्ते', 'hi': 'नमस्ते', 
-            'good morning': 'शुभ प्रभात', 'good afternoon': 'शुभ दोपहर',
-            'good evening': 'शुभ संध्या', 'good night': 'शुभ रात्रि',
-            'thank you': 'धन्यवाद', 'thanks': 'शुक्रिया',
-            'please': 'कृपया', 'sorry': 'क्षमा करें',
-            'yes': 'हाँ', 'no': 'नहीं', 'ok': 'ठीक है',
-            
-            # Pronouns
-            'i': 'मैं', 'you': 'आप', 'he': 'वह', 'she': 'वह', 
-            'we': 'हम', 'they': 'वे', 'me': 'मुझे',
-            'my': 'मेरा', 'your': 'आपका', 'our': 'हमारा', 'their': 'उनका',
-            
-            # Common verbs
-            'is': 'है', 'am': 'हूँ', 'are': 'हैं', 'was': 'था',
-            'have': 'है', 'has': 'है', 'do': 'करता', 'does': 'करता',
-            'can': 'सकता', 'will': 'गा',
-            
-            # Question words
-            'what': 'क्या', 'when': 'कब', 'where': 'कहाँ', 'why': 'क्यों',
-            'how': 'कैसे', 'who': 'कौन',
-            
-            # Common nouns
-            'name': 'नाम', 'time': 'समय', 'day': 'दिन', 
-            'person': 'व्यक्ति', 'people': 'लोग', 
-            'friend': 'दोस्त', 'family': 'परिवार', 'home': 'घर',
-            'food': 'भोजन', 'water': 'पानी', 'school': 'विद्यालय',
-            'work': 'काम', 'city': 'शहर', 'country': 'देश',
-            
-            # Project related terms - FIXED TRANSLATIONS
-            'project': 'परियोजना', 'capstone': 'कैपस्टोन', 
-            'handwriting': 'हस्तलेखन', 'bot': 'बॉट', 
-            'printer': 'मुद्रक', 'generative': 'जनरेटिव',
-            'ai': 'कृत्रिम बुद्धिमत्ता', 'artificial': 'कृत्रिम',
-            'intelligence': 'बुद्धिमत्ता', 'using': 'उपयोग कर रहा है',
-            'this': 'यह', 'that': 'वह', 'these': 'ये',
-            
-            # Common adjectives
-            'good': 'अच्छा', 'bad': 'बुरा', 'big': 'बड़ा', 'small': 'छोटा',
-            'beautiful': 'सुंदर', 'new': 'नया', 'old': 'पुराना',
-            
-            # Demo text translations
-            'our capstone project': 'हमारी कैपस्टोन परियोजना',
-            'handwriting bot': 'हस्तलेखन बॉट',
-            'generative ai': 'जनरेटिव एआई',
-            'demo text': 'डेमो पाठ',
-            'sample text': 'नमूना पाठ',
-            'test': 'परीक्षण',
-            'demo': 'डेमो',
-            'example': 'उदाहरण',
-            
-            # Numbers
-            'one': 'एक', 'two': 'दो', 'three': 'तीन', 'four': 'चार', 'five': 'पाँच',
-            'six': 'छह', 'seven': 'सात', 'eight': 'आठ', 'nine': 'नौ', 'ten': 'दस',
-        }
-        
-        # Convert to lowercase for matching but preserve original for display
-        original_text = text
-        lower_text = text.lower()
-        
-        print(f"Text to translate: '{lower_text}'")  # Debug print
-        
-        # First check for exact phrase matches
-        translated_text = original_text
-        for english_phrase in sorted(translation_map.keys(), key=len, reverse=True):
-            if english_phrase in lower_text:
-                hindi_phrase = translation_map[english_phrase]
-                # Replace the phrase while preserving case
-                start_idx = lower_text.find(english_phrase)
-                if start_idx != -1:
-                    # Replace the exact phrase found
-                    before = translated_text[:start_idx]
-                    after = translated_text[start_idx + len(english_phrase):]
-                    translated_text = before + hindi_phrase + after
-                    lower_text = lower_text.replace(english_phrase, hindi_phrase, 1)
-                print(f"Translated '{english_phrase}' to '{hindi_phrase}'")  # Debug print
-        
-        # If no translation occurred, provide a meaningful Hindi text
-        if translated_text == original_text:
-            if len(original_text.split()) > 2:
-                translated_text = "यह हस्तलेखन परियोजना का प्रदर्शन है"
-            else:
-                translated_text = "हिंदी में स्वागत है"
-        
-        print(f"Final translated text: '{translated_text}'")  # Debug print
-        return translated_text
+        """Translate English text to Hindi using the compiled phrase dictionary"""
+        return self.translator.translate(text)
     
     def _hex_to_rgb(self, hex_color):
         """Convert hex color to RGB tuple"""
@@ -219,68 +689,119 @@ class HandwritingGenerator:
         else:
             return (0, 0, 0)  # Default to black
     
-    def _draw_character(self, draw, char, x, y, style_params, language, ink_rgb):
-        """Draw a single character with clean, readable styling"""
+    def _draw_character(self, line_mask, char, x, y, style_params, language, variant=None):
+        """Add a single character's cached glyph mask to the line's coverage mask.
         
-        # Create temporary image for the character
-        char_size = 120
-        char_img = Image.new('RGBA', (char_size, char_size), (0, 0, 0, 0))
-        char_draw = ImageDraw.Draw(char_img)
+        With a variant index the glyph is that copy of the character's
+        precomputed jittered variants instead of the plain glyph.
+        """
         
         # Load appropriate font
         font_path = self.style_manager.get_font_path(language, style_params['style'])
         font_size = style_params['font_size']
         
-        try:
-            # Try to load the specified font
-            font = ImageFont.truetype(font_path, font_size)
-            print(f"Loaded font: {font_path} with size {font_size}")  # Debug print
-        except Exception as e:
-            print(f"Font loading failed: {e}")  # Debug print
-            try:
-                # Fallback to default font
-                font = ImageFont.load_default()
-                print("Using default font")  # Debug print
-            except:
-                print("Failed to load any font")  # Debug print
-                return
-        
-        # Get character metrics for proper alignment
-        try:
-            bbox = char_draw.textbbox((0, 0), char, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
+        if variant is None:
+            glyph = self.glyph_atlas.get_glyph(font_path, font_size, char)
+        else:
+            variants = self.glyph_atlas.get_variants(font_path, font_size, char,
+                                                     self.style_manager.jitter(style_params))
+            glyph = variants[variant] if variants else None
+        if glyph is None:
+            return
+        
+        # Place character mask with its origin at the pen position on the baseline
+        line_mask.add(glyph, x, y)
+    
+    def _draw_words(self, line_mask, line, x, y, style_params, draw_params, language, font_path, font_table,
+                    geometry, rng=None):
+        """Add one word mask per word of a line to the line's coverage mask.
+        
+        Styles with glyph jitter cache each word once per variant index, and
+        every occurrence picks its index from rng, so natural variation costs
+        no per-character work once the variants are cached.
+        """
+        
+        shaped = language in self.SHAPED_LANGUAGES
+        tracking = self._tracking(style_params)
+        jittered = not shaped and self.style_manager.jitter(style_params) is not None
+        advances = None
+        if not shaped and font_table:
+            advances = font_table.advances_px(line, style_params['font_size'])
+        
+        char_idx = 0
+        for word_idx, word in enumerate(line.split(' ')):
+            if word_idx:
+                # Handle spaces
+                x += style_params['word_spacing']
+                char_idx += 1
+            if not word:
+                continue
             
-            # Calculate position to center character
-            text_x = (char_size - text_width) // 2
-            text_y = (char_size - text_height) // 2
+            if shaped:
+                # Complex scripts are shaped as a whole word by the font's layout engine
+                mask = self.word_atlas.get_word(font_path, draw_params['font_size'], word, style_params['style'])
+                # Advances are measured at the base size so every DPI lays out identically
+                advance = self.word_atlas.advance(font_path, style_params['font_size'], word)
+            else:
+                if advances is not None:
+                    word_advances = advances[char_idx:char_idx + len(word)] + tracking
+                else:
+                    word_advances = np.full(len(word), style_params['char_spacing'], dtype=np.float32)
+                variant = None
+                if jittered:
+                    variant = int(rng.integers(self.config.GLYPH_VARIANTS)) if rng is not None else 0
+                mask = self.word_atlas.get_word(
+                    font_path, draw_params['font_size'], word,
+                    style_params['style'] if variant is None else (style_params['style'], variant),
+                    builder=lambda: self._compose_word(word, word_advances, draw_params, language, geometry, variant)
+                )
+                advance = float(word_advances.sum())
             
-            print(f"Character '{char}' - Width: {text_width}, Height: {text_height}")  # Debug print
-        except Exception as e:
-            print(f"Bbox calculation failed: {e}")  # Debug print
-            # Fallback positioning
-            text_x = char_size // 2 - 15
-            text_y = char_size // 2 - 20
-        
-        # Draw character with full opacity for clear text
-        ink_r, ink_g, ink_b = ink_rgb
-        main_color = (ink_r, ink_g, ink_b, 255)  # Full opacity
-        
-        # Main character stroke - clean and clear
-        try:
-            char_draw.text((text_x, text_y), char, font=font, fill=main_color)
-            print(f"Successfully drew character: '{char}'")  # Debug print
-        except Exception as e:
-            print(f"Failed to draw character '{char}': {e}")  # Debug print
+            if mask is not None:
+                line_mask.add(mask, geometry.px(x), geometry.px(y))
+            x += advance
+            char_idx += len(word)
+    
+    def _draw_strokes(self, line_mask, line, x, y, style_params, draw_params, font_path, font_table, geometry, rng):
+        """Draw a line as pen strokes following the font's outlines and add them to the line's coverage mask"""
+        
+        # Characters advance exactly as in glyph mode; spaces advance by the word spacing
+        if font_table:
+            advances = font_table.advances_px(line, style_params['font_size']) + self._tracking(style_params)
+        else:
+            advances = np.full(len(line), style_params['char_spacing'], dtype=np.float32)
+        advances = np.where(np.array([char == ' ' for char in line]), style_params['word_spacing'], advances)
+        origins_x = (x + np.concatenate(([0.0], np.cumsum(advances[:-1])))) * geometry.scale
+        
+        paths = self.stroke_engine.generate_line_paths(line, draw_params, font_path, rng=rng, scale=geometry.scale)
+        strokes = [stroke + (origin_x, y * geometry.scale)
+                   for origin_x, char_strokes in zip(origins_x, paths) for stroke in char_strokes]
+        if not strokes:
             return
         
-        # Calculate final position
-        char_width, char_height = char_img.size
-        paste_x = int(x) - char_width // 2
-        paste_y = int(y) - char_height // 2
+        pen = dict(self.STROKE_PEN, base_width=self.STROKE_PEN['base_width'] * geometry.scale)
+        dynamics = self.stroke_engine.apply_pen_dynamics_batch(strokes, pen, rng=rng)
+        rendered = self.stroke_rasterizer.rasterize(*zip(*dynamics))
+        if rendered is not None:
+            mask, left, top = rendered
+            line_mask.add(Glyph(mask, left, top), 0, 0)
+    
+    def _compose_word(self, word, word_advances, style_params, language, geometry, variant=None):
+        """Build a word mask from cached glyphs, spaced exactly like the per-character layout"""
+        
+        word_mask = CoverageMask()
+        x = 0.0
+        for idx, (char, char_advance) in enumerate(zip(word, word_advances)):
+            # Neighbouring letters take successive variants, so doubled letters differ
+            self._draw_character(word_mask, char, geometry.px(x), 0, style_params, language,
+                                 None if variant is None else variant + idx)
+            x += char_advance
         
-        # Paste character onto main canvas
-        draw._image.paste(char_img, (paste_x, paste_y), char_img)
+        rendered = word_mask.render()
+        if rendered is None:
+            return None
+        mask, left, top = rendered
+        return ShapedWord(mask, left, top, x)
     
     def _post_process(self, image):
         """Apply final post-processing for clear output"""
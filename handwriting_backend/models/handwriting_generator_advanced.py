@@ -1,80 +1,184 @@
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import bezier
-import random
 import math
-from scipy.interpolate import splprep, splev
+import threading
+from collections import OrderedDict
+from scipy.interpolate import make_interp_spline
+from config import Config
+from utils.glyph_outlines import OutlineStore
+
+
+class StrokeFit:
+    """Cached smoothing spline of a character's base outline.
+    
+    An interpolating spline is linear in the points it passes through, so the
+    fit is kept as a basis matrix with curve = basis @ points. Perturbed
+    points are then smoothed with one matrix product instead of a new fit.
+    """
+    
+    __slots__ = ('points', 'basis', 'curve')
+    
+    def __init__(self, points, basis, curve):
+        self.points = points
+        self.basis = basis
+        self.curve = curve
+
 
 class AdvancedHandwritingGenerator:
     """Advanced handwriting generation with bezier curves and natural strokes"""
     
-    def __init__(self):
-        self.stroke_cache = {}
-        
-    def generate_character_path(self, char, style_params):
+    # Samples along each smoothed character curve
+    CURVE_SAMPLES = 100
+    # Most outline points a contour's spline is fitted through
+    MAX_CONTROL_POINTS = 16
+    # Font size the synthetic fallback outlines are drawn at
+    SYNTHETIC_EM = 40
+    
+    def __init__(self, seed=None, cache_size=None, outline_store=None, preload=True):
+        self.config = Config()
+        self.rng = np.random.default_rng(seed)
+        self.cache_size = cache_size or self.config.STROKE_CACHE_SIZE
+        # Real glyph contours come from per-font outline caches mapped up front,
+        # so no font is parsed while strokes are generated
+        self.outline_store = outline_store or OutlineStore()
+        if preload:
+            self.outline_store.load_all()
+        # Base spline fits per character, least recently used first
+        self.stroke_cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def generate_character_path(self, char, style_params, font_path=None):
         """Generate natural bezier curve path for character"""
         
-        # Get character outline points
-        points = self._get_character_outline(char)
-        
-        if not points:
-            return []
-        
-        # Add natural variations
-        points = self._add_hand_tremor(points, style_params)
-        
-        # Create smooth bezier curves
-        curves = self._create_bezier_curves(points)
+        return self.generate_line_paths(char, style_params, font_path)[0]
+    
+    def generate_line_paths(self, text, style_params, font_path=None, rng=None, scale=1.0):
+        """Generate the strokes of every character of a line (or a whole page) in one batched pass.
+        
+        Returns one list of strokes per character; whitespace has no strokes.
+        Each stroke is an (n, 2) array of points relative to the character's
+        origin on the baseline, scaled to style_params['font_size']. With a
+        font_path the strokes follow that font's glyph contours. rng overrides
+        the generator's own random source, e.g. for seeded renders. Tremor is
+        sized for 300 DPI and multiplied by scale, the page's resolution
+        relative to that, so it stays in proportion to the letters.
+        """
+        
+        rng = rng or self.rng
+        
+        # One (char index, fit) item per contour of every character
+        items = []
+        for idx, char in enumerate(text):
+            if not char.isspace():
+                items.extend((idx, fit) for fit in self._get_stroke_fits(char, font_path))
+        
+        # Contours sharing a basis shape are perturbed and smoothed together
+        groups = {}
+        for item_idx, (_, fit) in enumerate(items):
+            groups.setdefault(fit.basis.shape, []).append(item_idx)
+        
+        font_size = style_params.get('font_size', self.SYNTHETIC_EM)
+        tremor_amount = style_params.get('pressure_var', 0.2) * 2 * scale
+        curves = [None] * len(items)
+        for indices in groups.values():
+            smoothed = np.stack([items[item_idx][1].curve for item_idx in indices]) * font_size
+            if tremor_amount > 0:
+                # Add natural hand tremor to the outline points, then smooth it with the cached fits
+                tremor = rng.normal(0, tremor_amount, (len(indices),) + items[indices[0]][1].points.shape)
+                smoothed += np.stack([items[item_idx][1].basis for item_idx in indices]) @ tremor
+            for item_idx, curve in zip(indices, smoothed):
+                curves[item_idx] = curve
+        
+        paths = [[] for _ in text]
+        for (idx, _), curve in zip(items, curves):
+            paths[idx].append(curve)
+        
+        if self._outlines(font_path) is not None:
+            # Each contour of a real glyph is drawn as its own stroke
+            return paths
         
         # Add pen lifting points for realistic strokes
-        strokes = self._segment_into_strokes(curves, char)
-        
-        return strokes
+        return [self._segment_into_strokes(curves[0], char) if curves else []
+                for char, curves in zip(text, paths)]
+    
+    def _outlines(self, font_path):
+        return self.outline_store.get(font_path) if font_path else None
+    
+    def _get_stroke_fits(self, char, font_path=None):
+        """Return the cached base spline fits of a character's contours, fitting them on a miss"""
+        
+        outlines = self._outlines(font_path)
+        # Synthetic outlines only depend on the lower-case letter
+        key = (font_path, char) if outlines is not None else (None, char.lower())
+        with self._lock:
+            fits = self.stroke_cache.get(key)
+            if fits is not None:
+                self.stroke_cache.move_to_end(key)
+                self.hits += 1
+                return fits
+            self.misses += 1
+        
+        fits = [self._fit_stroke(contour) for contour in self._get_character_outline(char, outlines)]
+        
+        with self._lock:
+            self.stroke_cache[key] = fits
+            while len(self.stroke_cache) > self.cache_size:
+                self.stroke_cache.popitem(last=False)
+                self.evictions += 1
+        return fits
     
-    def _get_character_outline(self, char):
-        """Extract outline points from character"""
+    def _get_character_outline(self, char, outlines=None):
+        """Extract a character's contours as (n, 2) arrays in em units, y down from the baseline"""
         
-        # This would use fonttools to get actual glyph outlines
-        # Simplified version here
+        if outlines is not None:
+            contours = outlines.contours(char)
+            if contours is not None:
+                return [self._decimate(np.asarray(contour, dtype=np.float64)) for contour in contours]
+        
+        # Without a font (or a glyph for the character) fall back to simplified shapes
         if char.lower() in 'aeiou':
             # Vowels - simple curves
             angles = np.linspace(0, 2*np.pi, 20)
-            points = [(np.cos(a)*20, np.sin(a)*30) for a in angles]
+            points = np.column_stack((np.cos(angles)*20, np.sin(angles)*30))
         else:
             # Consonants - more complex
             points = self._generate_consonant_points(char)
         
-        return points
+        return [points / self.SYNTHETIC_EM]
     
-    def _add_hand_tremor(self, points, style_params):
-        """Add natural hand tremor to points"""
-        
-        tremor_amount = style_params.get('pressure_var', 0.2) * 2
+    def _decimate(self, contour):
+        """Keep at most MAX_CONTROL_POINTS outline points, evenly spaced along the contour"""
         
-        modified_points = []
-        for x, y in points:
-            # Add small random tremor
-            x += random.gauss(0, tremor_amount)
-            y += random.gauss(0, tremor_amount)
-            modified_points.append((x, y))
+        if len(contour) <= self.MAX_CONTROL_POINTS:
+            return contour
         
-        return modified_points
+        distance = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(contour, axis=0).T))))
+        targets = np.linspace(0, distance[-1], self.MAX_CONTROL_POINTS)
+        indices = np.unique(np.clip(np.searchsorted(distance, targets), 0, len(contour) - 1))
+        return contour[indices]
     
-    def _create_bezier_curves(self, points):
-        """Create smooth bezier curves through points"""
+    def _fit_stroke(self, points):
+        """Fit an interpolating cubic spline through outline points and keep it as a basis matrix"""
         
-        if len(points) < 4:
-            return [points]
+        # Repeated points would give zero-length chords
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(np.diff(points, axis=0) != 0, axis=1)
+        points = points[keep]
         
-        # Use scipy for smooth interpolation
-        points = np.array(points)
-        tck, u = splprep([points[:, 0], points[:, 1]], s=0, per=False)
+        if len(points) < 4:
+            # Too few points to smooth; the stroke follows them directly
+            return StrokeFit(points, np.eye(len(points)), points)
         
-        # Generate smooth curve
-        u_new = np.linspace(0, 1, 100)
-        smooth_points = splev(u_new, tck)
+        # Chord-length parameter, as splprep uses for its fits
+        chords = np.hypot(*np.diff(points, axis=0).T)
+        u = np.concatenate(([0.0], np.cumsum(chords)))
+        u /= u[-1]
         
-        return list(zip(smooth_points[0], smooth_points[1]))
+        # Fitting the identity gives the spline's weights for each point
+        basis = make_interp_spline(u, np.eye(len(points)), k=3)(np.linspace(0, 1, self.CURVE_SAMPLES))
+        return StrokeFit(points, basis, basis @ points)
     
     def _segment_into_strokes(self, curve, char):
         """Segment curve into natural pen strokes"""
@@ -108,79 +212,95 @@ class AdvancedHandwritingGenerator:
         
         # Simplified consonant generation
         # In reality, would use font metrics
-        base_points = [
+        base_points = np.array([
             (0, 0), (10, -20), (15, -25), (20, -20),
             (25, 0), (20, 5), (10, 5), (0, 0)
-        ]
+        ], dtype=np.float64)
         
         # Add character-specific variations
         char_offset = ord(char.lower()) - ord('a')
         rotation = (char_offset * 15) % 360
         
         # Rotate points
-        rotated = []
-        for x, y in base_points:
-            rad = math.radians(rotation)
-            x_rot = x * math.cos(rad) - y * math.sin(rad)
-            y_rot = x * math.sin(rad) + y * math.cos(rad)
-            rotated.append((x_rot, y_rot))
-        
-        return rotated
+        rad = math.radians(rotation)
+        rotation_matrix = np.array([[math.cos(rad), math.sin(rad)], [-math.sin(rad), math.cos(rad)]])
+        return base_points @ rotation_matrix
     
     def apply_pen_dynamics(self, stroke, pen_params):
         """Apply realistic pen dynamics to stroke"""
         
-        # Vary width based on speed and pressure
-        width_profile = self._generate_width_profile(len(stroke), pen_params)
+        (points, widths, opacities), = self.apply_pen_dynamics_batch([stroke], pen_params)
+        
+        return [
+            {'position': (float(point[0]), float(point[1])), 'width': float(width), 'opacity': float(opacity)}
+            for point, width, opacity in zip(points, widths, opacities)
+        ]
+    
+    def apply_pen_dynamics_batch(self, strokes, pen_params, rng=None):
+        """Width and opacity profiles for many strokes in one pass; returns (points, widths, opacities) per stroke"""
+        
+        rng = rng or self.rng
+        lengths = np.array([len(stroke) for stroke in strokes], dtype=np.int64)
+        t = self._stroke_positions(lengths)
         
-        # Apply ink flow variations
-        opacity_profile = self._generate_opacity_profile(len(stroke), pen_params)
+        # Vary width based on speed and pressure, and apply ink flow variations
+        splits = np.cumsum(lengths)[:-1]
+        widths = np.split(self._width_profile(t, pen_params, rng), splits)
+        opacities = np.split(self._opacity_profile(t, pen_params, rng), splits)
         
-        enhanced_stroke = []
-        for i, point in enumerate(stroke):
-            enhanced_stroke.append({
-                'position': point,
-                'width': width_profile[i],
-                'opacity': opacity_profile[i]
-            })
+        return [(np.asarray(stroke, dtype=np.float64).reshape(-1, 2), width, opacity)
+                for stroke, width, opacity in zip(strokes, widths, opacities)]
+    
+    @staticmethod
+    def _stroke_positions(lengths):
+        """Position of every point along its own stroke, from 0 at the start to 1 at the end"""
         
-        return enhanced_stroke
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        spans = np.repeat(np.maximum(lengths - 1, 1), lengths)
+        return (np.arange(int(lengths.sum())) - starts) / spans
     
     def _generate_width_profile(self, length, pen_params):
         """Generate realistic stroke width profile"""
         
+        return self._width_profile(self._stroke_positions(np.array([length])), pen_params)
+    
+    def _width_profile(self, t, pen_params, rng=None):
         base_width = pen_params.get('base_width', 2.0)
         width_range = pen_params.get('width_range', (0.8, 1.2))
         
-        # Start thin, get thicker in middle, thin at end
-        profile = []
-        for i in range(length):
-            t = i / max(length - 1, 1)
-            
-            # Bell curve for width
-            width_factor = math.exp(-(t - 0.5)**2 / 0.1)
-            width = base_width * (width_range[0] + width_factor * (width_range[1] - width_range[0]))
-            
-            # Add small random variations
-            width += random.gauss(0, 0.1)
-            profile.append(max(0.5, width))
-        
-        return profile
+        # Start thin, get thicker in middle, thin at end (bell curve for width)
+        width_factor = np.exp(-(t - 0.5)**2 / 0.1)
+        width = base_width * (width_range[0] + width_factor * (width_range[1] - width_range[0]))
+        
+        # Add small random variations
+        width += (rng or self.rng).normal(0, 0.1, t.shape)
+        return np.maximum(width, 0.5)
     
     def _generate_opacity_profile(self, length, pen_params):
         """Generate realistic opacity profile for ink flow"""
         
+        return self._opacity_profile(self._stroke_positions(np.array([length])), pen_params)
+    
+    def _opacity_profile(self, t, pen_params, rng=None):
         base_opacity = pen_params.get('opacity', 0.9)
         
-        profile = []
-        for i in range(length):
-            t = i / max(length - 1, 1)
-            
-            # Slightly less opacity at stroke ends
-            opacity = base_opacity * (0.9 + 0.1 * math.sin(t * math.pi))
-            
-            # Random ink flow variations
-            opacity += random.gauss(0, 0.02)
-            profile.append(min(1.0, max(0.3, opacity)))
-        
-        return profile
\ No newline at end of file
+        # Slightly less opacity at stroke ends
+        opacity = base_opacity * (0.9 + 0.1 * np.sin(t * np.pi))
+        
+        # Random ink flow variations
+        opacity += (rng or self.rng).normal(0, 0.02, t.shape)
+        return np.clip(opacity, 0.3, 1.0)
+    
+    def stats(self):
+        """Return hit/miss counters for the stroke fit cache"""
+        
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'characters': len(self.stroke_cache),
+                'max_characters': self.cache_size
+            }
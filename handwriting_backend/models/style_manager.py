@@ -1,11 +1,32 @@
 import os
+import logging
 import random
 from config import Config
+from models.style_manager_enhanced import EnhancedStyleManager
+
+logger = logging.getLogger(__name__)
+
+# Missing font paths already reported, so the fallback warning is logged once per path
+_missing_fonts = set()
+
+def _warn_missing_font(font_path):
+    if font_path not in _missing_fonts:
+        _missing_fonts.add(font_path)
+        logger.warning("Font file not found: %s", font_path)
 
 class StyleManager:
+    # Scale applied to font size and spacing for each size option
+    SIZE_MULTIPLIERS = {
+        'small': 0.85,
+        'medium': 1.0,
+        'large': 1.15
+    }
+    
     def __init__(self):
         self.config = Config()
+        self.enhanced = EnhancedStyleManager()
         self.styles = self._initialize_styles()
+        self._add_enhanced_styles()
         
     def _initialize_styles(self):
         """Initialize style parameters for clean, readable handwriting"""
@@ -57,19 +78,37 @@ class StyleManager:
             }
         }
     
+    def _add_enhanced_styles(self):
+        """Add the expressive styles of EnhancedStyleManager alongside the clean ones"""
+        
+        for language, styles in self.enhanced.advanced_styles.items():
+            for name, params in styles.items():
+                self.styles.setdefault(language, {})[name] = dict(
+                    params,
+                    # Letters are spaced by the font's own advances, without extra tracking
+                    char_width=params['char_spacing'],
+                    style=name
+                )
+    
+    def get_pen_characteristics(self, pen_type):
+        """Opacity, bleed and texture of a pen type"""
+        
+        return self.enhanced.get_pen_characteristics(pen_type)
+    
+    def jitter(self, style_params):
+        """Per-glyph (rotation_var, slant, baseline_var) of a style, or None if it draws glyphs unchanged"""
+        
+        jitter = (style_params.get('rotation_var', 0), style_params.get('slant', 0),
+                  style_params.get('baseline_var', 0))
+        return jitter if any(jitter) else None
+    
     def get_style_params(self, language, style, size):
         """Get style parameters with size adjustments"""
         
         base_params = self.styles.get(language, {}).get(style, self.styles['hindi']['casual'])
         
         # Apply size multiplier
-        size_multipliers = {
-            'small': 0.85,
-            'medium': 1.0,
-            'large': 1.15
-        }
-        
-        multiplier = size_multipliers.get(size, 1.0)
+        multiplier = self.SIZE_MULTIPLIERS.get(size, 1.0)
         
         # Scale size-related parameters
         scaled_params = base_params.copy()
@@ -87,11 +126,19 @@ class StyleManager:
         font_map = {
             'english': {
                 'casual': 'fonts/english/Kalam-Regular.ttf',
-                'formal': 'fonts/english/GreatVibes-Regular.ttf'
+                'formal': 'fonts/english/GreatVibes-Regular.ttf',
+                'doctor': 'fonts/english/IndieFlower-Regular.ttf',
+                'child': 'fonts/english/ComicNeue-Regular.ttf',
+                'artistic': 'fonts/english/GreatVibes-Regular.ttf',
+                'hurried': 'fonts/english/Kalam-Regular.ttf',
+                'vintage': 'fonts/english/PatrickHand-Regular.ttf'
             },
             'hindi': {
                 'casual': 'fonts/hindi/NotoSansDevanagari-Regular.ttf',
-                'formal': 'fonts/hindi/NotoSerifDevanagari-Regular.ttf'
+                'formal': 'fonts/hindi/NotoSerifDevanagari-Regular.ttf',
+                'modern': 'fonts/hindi/Laila-Regular.ttf',
+                'calligraphy': 'fonts/hindi/Tillana-Regular.ttf',
+                'student': 'fonts/hindi/Kalam-Regular.ttf'
             }
         }
         
@@ -107,7 +154,7 @@ class StyleManager:
             if os.path.exists(font_path):
                 return font_path
             else:
-                print(f"Font file not found: {font_path}")
+                _warn_missing_font(font_path)
                 # Fallback to fonts that definitely support Hindi
                 if language == 'hindi':
                     # Try different Hindi font paths
@@ -125,5 +172,5 @@ class StyleManager:
                 return default_hindi_font if language == 'hindi' else default_english_font
                 
         except Exception as e:
-            print(f"Error getting font path: {e}")
+            logger.warning("Error getting font path: %s", e)
             return default_hindi_font if language == 'hindi' else default_english_font
\ No newline at end of file
@@ -153,6 +153,13 @@ class EnhancedStyleManager:
         """Get characteristics of different pen types"""
         
         pen_chars = {
+            'ink': {
+                'color': (0, 0, 0),
+                'opacity': 1.0,
+                'bleed': 0.05,
+                'texture': 'smooth',
+                'width_range': (1.0, 1.1)
+            },
             'ballpoint': {
                 'color': (0, 0, 100),
                 'opacity': 0.9,
@@ -1,3 +1,5 @@
+from utils import metrics
+
 class TextProcessor:
     def __init__(self):
         self.max_line_length = 80
@@ -5,6 +7,10 @@ class TextProcessor:
     def process(self, text, language='english'):
         """Process text for handwriting generation"""
         
+        with metrics.timed('text_processing'):
+            return self._process(text, language)
+    
+    def _process(self, text, language):
         # Clean text
         text = self._clean_text(text)
         
@@ -0,0 +1,153 @@
+import logging
+import re
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Words are runs of letters/digits, optionally joined by apostrophes (don't, it's)
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*")
+
+# Trie nodes are dicts keyed by lowercase word; this key holds the translation
+_VALUE = None
+
+
+class PhraseTranslator:
+    """Word-boundary aware phrase translation using a trie of word sequences"""
+    
+    def __init__(self, entries=None):
+        self._root = {}
+        self.size = 0
+        self.max_words = 0
+        for phrase, translation in (entries or {}).items():
+            self.add(phrase, translation)
+    
+    @classmethod
+    def from_file(cls, path):
+        """Load a tab-separated dictionary of 'phrase<TAB>translation' lines"""
+        
+        translator = cls()
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.rstrip('\n')
+                if not line.strip() or line.lstrip().startswith('#'):
+                    continue
+                phrase, sep, translation = line.partition('\t')
+                if not sep or not translation.strip():
+                    logger.warning("Skipping malformed dictionary line %d in %s", line_no, path)
+                    continue
+                translator.add(phrase, translation.strip())
+        return translator
+    
+    def add(self, phrase, translation):
+        """Insert a phrase; later entries for the same phrase replace earlier ones"""
+        
+        words = WORD_PATTERN.findall(phrase.lower())
+        if not words:
+            return
+        
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        if _VALUE not in node:
+            self.size += 1
+        node[_VALUE] = translation
+        self.max_words = max(self.max_words, len(words))
+    
+    def translate(self, text):
+        """Replace the longest dictionary phrase at each word, left to right.
+        
+        Returns (translated_text, number_of_phrases_replaced). Words of a
+        phrase must be separated by whitespace only, so punctuation breaks
+        a phrase, and matches never start or end inside a word.
+        """
+        
+        translated, _, replaced = self._translate(text, final=True)
+        return translated, replaced
+    
+    def translate_partial(self, text):
+        """Translate text that more text will follow, holding back its last words.
+        
+        Returns (translated_text, held_back_text, number_of_phrases_replaced).
+        The held back text is the untranslated source from the first word a
+        phrase could still continue past the end of text; prepend it to what
+        follows so phrases spanning the two are still found.
+        """
+        
+        return self._translate(text, final=False)
+    
+    def _translate(self, text, final):
+        spans = [match.span() for match in WORD_PATTERN.finditer(text)]
+        words = [text[start:end].lower() for start, end in spans]
+        # Without more text to come a match may start at any word; otherwise only where it cannot run off the end
+        limit = len(words) if final else len(words) - max(self.max_words - 1, 0)
+        
+        parts = []
+        copied_to = 0
+        replaced = 0
+        i = 0
+        while i < limit:
+            # Walk the trie as far as the following words allow, remembering the longest hit
+            node = self._root
+            best = None
+            j = i
+            while j < len(words):
+                if j > i and not text[spans[j - 1][1]:spans[j][0]].isspace():
+                    break
+                node = node.get(words[j])
+                if node is None:
+                    break
+                j += 1
+                if _VALUE in node:
+                    best = (j, node[_VALUE])
+            
+            if best is None:
+                i += 1
+                continue
+            
+            end, translation = best
+            parts.append(text[copied_to:spans[i][0]])
+            parts.append(translation)
+            copied_to = spans[end - 1][1]
+            replaced += 1
+            i = end
+        
+        cut = spans[i][0] if i < len(words) else len(text)
+        parts.append(text[copied_to:cut])
+        return ''.join(parts), text[cut:], replaced
+
+
+class HindiTranslator:
+    """English to Hindi translation backed by the shipped phrase dictionary"""
+    
+    # Shown when the input has nothing the dictionary recognizes
+    EMPTY_TEXT = "हिंदी में स्वागत है"
+    FALLBACK_TEXT = "यह हस्तलेखन परियोजना का प्रदर्शन है"
+    
+    def __init__(self, dictionary_path=None):
+        self.config = Config()
+        self.dictionary_path = dictionary_path or self.config.HINDI_DICTIONARY_PATH
+        try:
+            self.phrases = PhraseTranslator.from_file(self.dictionary_path)
+        except OSError as e:
+            logger.error("Hindi dictionary unavailable at %s: %s", self.dictionary_path, e)
+            self.phrases = PhraseTranslator()
+    
+    def translate(self, text):
+        """Translate English text to Hindi, keeping unknown words as written"""
+        
+        if not text or not text.strip():
+            return self.EMPTY_TEXT
+        
+        text = text.strip()
+        translated_text, replaced = self.phrases.translate(text)
+        
+        # If no translation occurred, provide a meaningful Hindi text
+        if not replaced:
+            return self.fallback(len(text.split()))
+        
+        return translated_text
+    
+    def fallback(self, word_count):
+        """Text shown instead of input of word_count words in which no phrase was found"""
+        
+        return self.FALLBACK_TEXT if word_count > 2 else self.EMPTY_TEXT
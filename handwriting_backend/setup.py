@@ -22,6 +22,7 @@ def setup_project():
         config.OUTPUT_FOLDER,
         config.FONTS_FOLDER,
         config.TEMPLATES_FOLDER,
+        config.OUTLINE_CACHE_FOLDER,
         os.path.join(config.FONTS_FOLDER, 'english'),
         os.path.join(config.FONTS_FOLDER, 'hindi'),
     ]
@@ -44,6 +45,12 @@ def setup_project():
     sample_paper.save(os.path.join(config.TEMPLATES_FOLDER, 'ruled_paper.png'))
     print("   ✓ Ruled paper template created")
     
+    # Flatten glyph outlines once so the stroke engine never parses fonts per request
+    print("\n4. Building glyph outline caches...")
+    from utils.glyph_outlines import OutlineStore
+    outline_count = OutlineStore().load_all()
+    print(f"   ✓ {outline_count} font outline caches ready in {config.OUTLINE_CACHE_FOLDER}")
+    
     print("\n" + "="*50)
     print("Setup complete! You can now run the server with:")
     print("python app.py")
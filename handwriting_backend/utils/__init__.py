@@ -1,5 +1,23 @@
-from .image_utils import ImageUtils
-from .paper_generator import PaperGenerator
-from .font_utils import FontManager
+import importlib
 
-__all__ = ['ImageUtils', 'PaperGenerator', 'FontManager']
\ No newline at end of file
+# Utilities are imported on first use, so importing one module of the package
+# does not load every other one and its dependencies (OpenCV, requests, ...)
+_EXPORTS = {
+    'ImageUtils': 'image_utils',
+    'PaperGenerator': 'paper_generator',
+    'FontManager': 'font_utils',
+    'GlyphAtlas': 'glyph_atlas',
+    'ImageEncoder': 'image_encoder',
+    'FontMetrics': 'font_metrics',
+    'CoverageMask': 'compositor',
+    'InkCompositor': 'compositor'
+}
+
+__all__ = ['ImageUtils', 'PaperGenerator', 'FontManager', 'GlyphAtlas', 'ImageEncoder', 'FontMetrics', 'CoverageMask', 'InkCompositor']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import numpy as np
+from PIL import Image
+
+
+class CoverageMask:
+    """8-bit ink coverage for one line of text, sized to the glyphs placed on it"""
+    
+    def __init__(self):
+        self.placements = []
+    
+    def add(self, glyph, x, y):
+        """Place a glyph with its origin at (x, y) on the baseline"""
+        
+        self.placements.append((glyph.mask, int(x) + glyph.offset_x, int(y) + glyph.offset_y))
+    
+    def render(self, page_width=None, page_height=None):
+        """Build the coverage array for the inked bounding box; returns (mask, left, top) or None.
+        
+        With a page size the box is clipped to the page; without one it may
+        extend to negative coordinates, as for a word mask around its origin.
+        """
+        
+        if not self.placements:
+            return None
+        
+        left = min(x for _, x, _ in self.placements)
+        top = min(y for _, _, y in self.placements)
+        right = max(x + mask.shape[1] for mask, x, _ in self.placements)
+        bottom = max(y + mask.shape[0] for mask, _, y in self.placements)
+        if page_width is not None:
+            left, right = max(0, left), min(page_width, right)
+        if page_height is not None:
+            top, bottom = max(0, top), min(page_height, bottom)
+        if right <= left or bottom <= top:
+            return None
+        
+        coverage = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        for mask, x, y in self.placements:
+            # Clip the glyph against the page
+            x0, y0 = max(x, left), max(y, top)
+            x1, y1 = min(x + mask.shape[1], right), min(y + mask.shape[0], bottom)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            region = coverage[y0 - top:y1 - top, x0 - left:x1 - left]
+            np.maximum(region, mask[y0 - y:y1 - y, x0 - x:x1 - x], out=region)
+        
+        return coverage, left, top
+
+
+class InkCompositor:
+    """Blends ink into paper only where a coverage mask has been drawn"""
+    
+    @classmethod
+    def composite(cls, paper, coverage_mask, ink_rgb):
+        """Blend the ink colour into an RGB paper image in place, touching only the inked box"""
+        
+        return cls.composite_coverage(paper, coverage_mask.render(paper.width, paper.height), ink_rgb)
+    
+    @classmethod
+    def composite_coverage(cls, paper, rendered, ink_rgb):
+        """Blend a rendered (mask, left, top) coverage into an RGB paper image in place"""
+        
+        if rendered is None:
+            return paper
+        
+        coverage, left, top = rendered
+        box = (left, top, left + coverage.shape[1], top + coverage.shape[0])
+        region = np.array(paper.crop(box))
+        cls.blend(region, coverage, ink_rgb)
+        
+        paper.paste(Image.fromarray(region), box)
+        return paper
+    
+    @classmethod
+    def composite_band(cls, band, band_top, rendered, ink_rgb):
+        """Blend the rows of a rendered coverage that fall inside a horizontal band of page rows"""
+        
+        coverage, left, top = rendered
+        y0 = max(top, band_top)
+        y1 = min(top + coverage.shape[0], band_top + band.shape[0])
+        if y1 <= y0:
+            return band
+        
+        cls.blend(band[y0 - band_top:y1 - band_top, left:left + coverage.shape[1]], coverage[y0 - top:y1 - top],
+                  ink_rgb)
+        return band
+    
+    @staticmethod
+    def blend(region, coverage, ink_rgb):
+        """Blend ink into a uint8 RGB array in place; coverage has the same height and width"""
+        
+        # out = paper * (1 - a) + ink * a, evaluated only on inked pixels
+        inked = np.nonzero(coverage)
+        alpha = coverage[inked].astype(np.uint16)[:, None]
+        pixels = region[inked].astype(np.uint16)
+        ink = np.array(ink_rgb, dtype=np.uint16)
+        region[inked] = ((pixels * (255 - alpha) + ink * alpha + 127) // 255).astype(np.uint8)
@@ -0,0 +1,192 @@
+import os
+import logging
+import tempfile
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured byte limit"""
+
+
+class DocumentLimitError(Exception):
+    """Raised when a document has more pages or characters than allowed"""
+
+
+class ChunkStream:
+    """Iterator over extracted text chunks that deletes its spooled file when closed"""
+    
+    def __init__(self, chunks, path=None):
+        self._chunks = chunks
+        self._buffered = None
+        self.path = path
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self._buffered is not None:
+            chunk, self._buffered = self._buffered, None
+            return chunk
+        return next(self._chunks)
+    
+    def empty(self):
+        """Read ahead to the first chunk; True if the document has no text at all"""
+        
+        if self._buffered is None:
+            self._buffered = next(self._chunks, None)
+        return self._buffered is None
+    
+    def close(self):
+        self._chunks.close()
+        if self.path:
+            DocumentIngestor.remove(self.path)
+            self.path = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DocumentIngestor:
+    """Spools uploads to disk and extracts their text incrementally, page by page"""
+    
+    # Bytes copied per read while spooling an upload
+    SPOOL_CHUNK_BYTES = 64 * 1024
+    
+    def __init__(self, max_bytes=None, max_pages=None, max_chars=None, chunk_chars=None, spool_dir=None):
+        self.config = Config()
+        self.max_bytes = max_bytes if max_bytes is not None else self.config.UPLOAD_MAX_BYTES
+        self.max_pages = max_pages if max_pages is not None else self.config.UPLOAD_MAX_PAGES
+        self.max_chars = max_chars if max_chars is not None else self.config.UPLOAD_MAX_CHARS
+        self.chunk_chars = chunk_chars or self.config.INGEST_CHUNK_CHARS
+        self.spool_dir = spool_dir or self.config.UPLOAD_FOLDER
+    
+    def spool(self, stream, filename=''):
+        """Copy an upload stream to a temp file in bounded chunks; returns the file path"""
+        
+        suffix = os.path.splitext(filename or '')[1].lower()
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix='upload_', dir=self.spool_dir)
+        written = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    block = stream.read(self.SPOOL_CHUNK_BYTES)
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > self.max_bytes:
+                        raise UploadTooLargeError(f'Upload exceeds {self.max_bytes} bytes')
+                    out.write(block)
+        except BaseException:
+            self.remove(path)
+            raise
+        return path
+    
+    def open_upload(self, file_storage):
+        """Spool an uploaded file and return a ChunkStream over its text"""
+        
+        path = self.spool(file_storage.stream, file_storage.filename)
+        return self.iter_file(path, file_storage.filename, remove=True)
+    
+    def iter_text(self, text):
+        """ChunkStream over submitted form text, with the character cap applied"""
+        
+        return ChunkStream(self._limit_chars(iter([text] if text and text.strip() else [])))
+    
+    def iter_file(self, path, filename=None, remove=False):
+        """ChunkStream over the text of a PDF, DOCX or plain-text file, extracted as it is read.
+        
+        PDFs yield one chunk per page; DOCX and text files yield runs of about
+        INGEST_CHUNK_CHARS characters that end on whitespace, so no word is
+        split between chunks. With remove=True the file is deleted when the
+        stream is closed.
+        """
+        
+        extension = os.path.splitext(filename or path)[1].lower()
+        if extension == '.pdf':
+            chunks = self._iter_pdf(path)
+        elif extension == '.docx':
+            chunks = self._iter_docx(path)
+        else:
+            chunks = self._iter_plain(path)
+        
+        return ChunkStream(self._limit_chars(chunks), path if remove else None)
+    
+    def _limit_chars(self, chunks):
+        total = 0
+        try:
+            for chunk in chunks:
+                total += len(chunk)
+                if total > self.max_chars:
+                    raise DocumentLimitError(f'Document exceeds {self.max_chars} characters')
+                yield chunk
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+    
+    def _iter_pdf(self, path):
+        import PyPDF2
+        
+        # Reading from an open file keeps page content on disk until it is extracted
+        with open(path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            # The page tree is read up front, so oversized documents fail before any extraction
+            page_count = len(reader.pages)
+            if page_count > self.max_pages:
+                raise DocumentLimitError(f'Document has {page_count} pages (max {self.max_pages})')
+            
+            for page in reader.pages:
+                text = page.extract_text() or ''
+                if text.strip():
+                    yield text
+    
+    def _iter_docx(self, path):
+        import docx
+        
+        document = docx.Document(path)
+        buffer = []
+        size = 0
+        for paragraph in document.paragraphs:
+            text = paragraph.text
+            if not text.strip():
+                continue
+            buffer.append(text)
+            size += len(text)
+            if size >= self.chunk_chars:
+                yield '\n'.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield '\n'.join(buffer)
+    
+    def _iter_plain(self, path):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            carry = ''
+            while True:
+                block = f.read(self.chunk_chars)
+                if not block:
+                    break
+                text = carry + block
+                # Hold back the trailing partial word for the next chunk
+                cut = max(text.rfind(' '), text.rfind('\n'))
+                if cut <= 0:
+                    carry = text
+                    continue
+                carry = text[cut + 1:]
+                yield text[:cut]
+            if carry:
+                yield carry
+    
+    @staticmethod
+    def remove(path):
+        """Delete a spooled upload, ignoring files that are already gone"""
+        
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Failed to delete spooled upload %s: %s", path, e)
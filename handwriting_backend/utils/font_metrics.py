@@ -0,0 +1,204 @@
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Advance tables cover the Basic Multilingual Plane; anything above maps to .notdef
+TABLE_SIZE = 0x10000
+
+
+class FontMetricsTable:
+    """Advance widths and pair kerning for one font, in font units"""
+    
+    def __init__(self, font_path):
+        from fontTools.ttLib import TTFont
+        
+        font = TTFont(font_path, lazy=True)
+        try:
+            self.units_per_em = font['head'].unitsPerEm
+            cmap = {cp: name for cp, name in font.getBestCmap().items() if cp < TABLE_SIZE}
+            hmtx = font['hmtx'].metrics
+            
+            # Unmapped codepoints advance like .notdef
+            notdef_advance = hmtx[font.getGlyphOrder()[0]][0]
+            self.advances = np.full(TABLE_SIZE, notdef_advance, dtype=np.float32)
+            for cp, name in cmap.items():
+                self.advances[cp] = hmtx[name][0]
+            
+            # x-height centres lowercase text on the writing line
+            os2 = font['OS/2'] if 'OS/2' in font else None
+            x_height = getattr(os2, 'sxHeight', 0) if os2 is not None else 0
+            self.x_height = x_height or self.units_per_em // 2
+            
+            glyph_to_cps = {}
+            for cp, name in cmap.items():
+                glyph_to_cps.setdefault(name, []).append(cp)
+            
+            self.pair_kerning = {}
+            self.class_kerning = []
+            self._load_kern_table(font, glyph_to_cps)
+            self._load_gpos_kerning(font, glyph_to_cps)
+        finally:
+            font.close()
+    
+    def _load_kern_table(self, font, glyph_to_cps):
+        """Read legacy 'kern' table format 0 pairs"""
+        
+        if 'kern' not in font:
+            return
+        for subtable in font['kern'].kernTables:
+            for (left, right), value in getattr(subtable, 'kernTable', {}).items():
+                for left_cp in glyph_to_cps.get(left, ()):
+                    for right_cp in glyph_to_cps.get(right, ()):
+                        self.pair_kerning.setdefault((left_cp, right_cp), value)
+    
+    def _load_gpos_kerning(self, font, glyph_to_cps):
+        """Read GPOS pair adjustment (type 2) subtables, formats 1 and 2"""
+        
+        if 'GPOS' not in font or font['GPOS'].table.LookupList is None:
+            return
+        
+        for lookup in font['GPOS'].table.LookupList.Lookup:
+            for subtable in lookup.SubTable:
+                if lookup.LookupType == 9:
+                    if subtable.ExtensionLookupType != 2:
+                        continue
+                    subtable = subtable.ExtSubTable
+                elif lookup.LookupType != 2:
+                    continue
+                
+                if subtable.Format == 1:
+                    self._load_pair_set(subtable, glyph_to_cps)
+                elif subtable.Format == 2:
+                    self._load_class_pairs(subtable, glyph_to_cps)
+    
+    def _load_pair_set(self, subtable, glyph_to_cps):
+        for left, pair_set in zip(subtable.Coverage.glyphs, subtable.PairSet):
+            left_cps = glyph_to_cps.get(left, ())
+            if not left_cps:
+                continue
+            for record in pair_set.PairValueRecord:
+                value = getattr(record.Value1, 'XAdvance', 0) if record.Value1 else 0
+                if not value:
+                    continue
+                for right_cp in glyph_to_cps.get(record.SecondGlyph, ()):
+                    for left_cp in left_cps:
+                        self.pair_kerning.setdefault((left_cp, right_cp), value)
+    
+    def _load_class_pairs(self, subtable, glyph_to_cps):
+        """Class-based kerning stays as per-codepoint class arrays plus a value matrix"""
+        
+        first = np.full(TABLE_SIZE, -1, dtype=np.int16)
+        second = np.zeros(TABLE_SIZE, dtype=np.int16)
+        class1 = subtable.ClassDef1.classDefs if subtable.ClassDef1 else {}
+        class2 = subtable.ClassDef2.classDefs if subtable.ClassDef2 else {}
+        
+        for name in subtable.Coverage.glyphs:
+            for cp in glyph_to_cps.get(name, ()):
+                first[cp] = class1.get(name, 0)
+        for name, cls in class2.items():
+            for cp in glyph_to_cps.get(name, ()):
+                second[cp] = cls
+        
+        matrix = np.zeros((subtable.Class1Count, subtable.Class2Count), dtype=np.float32)
+        for i, class1_record in enumerate(subtable.Class1Record):
+            for j, class2_record in enumerate(class1_record.Class2Record):
+                value = class2_record.Value1
+                matrix[i, j] = getattr(value, 'XAdvance', 0) if value else 0
+        
+        if matrix.any():
+            self.class_kerning.append((first, second, matrix))
+    
+    def codepoints(self, text):
+        """Text as an array of table indices"""
+        
+        cps = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        return np.where(cps < TABLE_SIZE, cps, 0).astype(np.int64)
+    
+    def kerning(self, cps):
+        """Kerning adjustment between each character and the next, in font units"""
+        
+        kern = np.zeros(len(cps), dtype=np.float32)
+        if len(cps) < 2:
+            return kern
+        
+        left, right = cps[:-1], cps[1:]
+        matched = np.zeros(len(left), dtype=bool)
+        
+        if self.pair_kerning:
+            for i, pair in enumerate(zip(left.tolist(), right.tolist())):
+                value = self.pair_kerning.get(pair)
+                if value:
+                    kern[i] = value
+                    matched[i] = True
+        
+        # First matching subtable wins, as in GPOS lookup processing
+        for first, second, matrix in self.class_kerning:
+            cls1 = first[left]
+            applies = (cls1 >= 0) & ~matched
+            if applies.any():
+                values = matrix[np.maximum(cls1, 0), second[right]]
+                kern[:-1] = np.where(applies, values, kern[:-1])
+                matched |= applies
+        
+        return kern
+    
+    def advances_px(self, text, font_size):
+        """Per-character pen advance in pixels, including kerning with the next character"""
+        
+        cps = self.codepoints(text)
+        return (self.advances[cps] + self.kerning(cps)) * (font_size / self.units_per_em)
+    
+    def text_width(self, text, font_size):
+        """Width of a run of text in pixels"""
+        
+        return float(self.advances_px(text, font_size).sum())
+
+
+class FontMetrics:
+    """Builds metrics tables once per font file and shares them across renders"""
+    
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+    
+    def table(self, font_path):
+        """Return the metrics table for a font, or None if it cannot be parsed"""
+        
+        if font_path in self._tables:
+            return self._tables[font_path]
+        
+        with self._lock:
+            if font_path not in self._tables:
+                try:
+                    self._tables[font_path] = FontMetricsTable(font_path)
+                except Exception as e:
+                    logger.warning("Font metrics unavailable for %s: %s", font_path, e)
+                    self._tables[font_path] = None
+            return self._tables[font_path]
+    
+    def word_widths(self, words, font_path, font_size, tracking=0):
+        """Widths of many words in one vectorized pass over the advance table"""
+        
+        table = self.table(font_path)
+        if table is None or not words:
+            return None
+        
+        lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+        cps = table.codepoints(''.join(words))
+        advances = table.advances[cps]
+        
+        # Sum advances per word via offsets into the joined codepoint array
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        widths = np.add.reduceat(advances, offsets) if len(advances) else np.zeros(len(words))
+        widths = np.where(lengths > 0, widths, 0)
+        
+        if table.pair_kerning or table.class_kerning:
+            kern = table.kerning(cps)
+            # Kerning across word boundaries does not apply
+            ends = offsets + lengths - 1
+            kern[ends[lengths > 0]] = 0
+            widths = widths + np.add.reduceat(kern, offsets)
+        
+        return widths * (font_size / table.units_per_em) + lengths * tracking
@@ -0,0 +1,231 @@
+import math
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Glyph:
+    """Pre-rasterized alpha mask of a single character plus its placement metrics"""
+
+    __slots__ = ('mask', 'offset_x', 'offset_y', 'width', 'height', 'nbytes')
+
+    def __init__(self, mask, offset_x, offset_y):
+        self.mask = mask
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.height, self.width = mask.shape
+        # Mask bytes plus a rough allowance for the Python objects around it
+        self.nbytes = mask.nbytes + 128
+
+
+class GlyphVariants:
+    """Jittered copies of one glyph; indexing wraps around so any integer picks a copy"""
+
+    __slots__ = ('glyphs', 'nbytes')
+
+    def __init__(self, glyphs):
+        self.glyphs = glyphs
+        self.nbytes = sum(glyph.nbytes for glyph in glyphs)
+
+    def __len__(self):
+        return len(self.glyphs)
+
+    def __getitem__(self, index):
+        return self.glyphs[index % len(self.glyphs)]
+
+
+def jitter_variants(glyph, count, rotation_var, slant, baseline_var, rng):
+    """Build count copies of a glyph, each sheared by the slant, rotated by up to
+    rotation_var degrees about its pen origin and shifted by up to baseline_var
+    pixels off the baseline.
+
+    All copies share one output grid and are resampled by a single cv2.remap
+    call over their stacked inverse maps.
+    """
+
+    import cv2
+
+    angles = np.radians(rng.uniform(-rotation_var, rotation_var, count))
+    shifts = rng.uniform(-baseline_var, baseline_var, count)
+    shear = math.tan(math.radians(slant))
+
+    # Forward maps rotate after shearing: x leans right by -y * tan(slant), since y is down from the baseline
+    cos, sin = np.cos(angles), np.sin(angles)
+    forward = np.empty((count, 2, 2))
+    forward[:, 0, 0] = cos
+    forward[:, 0, 1] = -cos * shear - sin
+    forward[:, 1, 0] = sin
+    forward[:, 1, 1] = -sin * shear + cos
+    offsets = np.zeros((count, 2))
+    offsets[:, 1] = shifts
+
+    # Output grid covering every transformed copy
+    x0, y0 = glyph.offset_x, glyph.offset_y
+    corners = np.array([(x0, y0), (x0 + glyph.width, y0), (x0, y0 + glyph.height),
+                        (x0 + glyph.width, y0 + glyph.height)], dtype=np.float64)
+    placed = corners @ forward.transpose(0, 2, 1) + offsets[:, None, :]
+    left, top = np.floor(placed.reshape(-1, 2).min(axis=0)).astype(int)
+    right, bottom = np.ceil(placed.reshape(-1, 2).max(axis=0)).astype(int)
+    width, height = right - left, bottom - top
+
+    # Source position of every output pixel centre, per copy
+    ys, xs = np.mgrid[top:bottom, left:right] + 0.5
+    grid = np.stack((xs, ys), axis=-1)
+    source = np.einsum('kij,khwj->khwi', np.linalg.inv(forward), grid[None] - offsets[:, None, None, :])
+    source -= (x0 + 0.5, y0 + 0.5)
+
+    warped = cv2.remap(glyph.mask, source[..., 0].reshape(count * height, width).astype(np.float32),
+                       source[..., 1].reshape(count * height, width).astype(np.float32),
+                       cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    return GlyphVariants([Glyph(np.ascontiguousarray(warped[k * height:(k + 1) * height]), left, top)
+                          for k in range(count)])
+
+
+class GlyphAtlas:
+    """Caches loaded fonts and rasterized glyph masks shared across renders"""
+
+    def __init__(self, max_bytes=None):
+        self.config = Config()
+        self.max_bytes = max_bytes if max_bytes is not None else self.config.GLYPH_CACHE_BYTES
+        self._fonts = {}
+        self._glyphs = OrderedDict()
+        self._lock = threading.Lock()
+        # FreeType faces are not safe to rasterize from several threads at once
+        self._raster_lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_font(self, font_path, font_size):
+        """Return one shared font handle per (font path, size)"""
+
+        key = (font_path, font_size)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        try:
+            font = ImageFont.truetype(font_path, font_size)
+        except Exception as e:
+            logger.warning("Font loading failed: %s", e)
+            try:
+                # Fallback to default font
+                font = ImageFont.load_default()
+            except Exception:
+                logger.error("Failed to load any font")
+                return None
+
+        self._fonts[key] = font
+        return font
+
+    def get_glyph(self, font_path, font_size, char):
+        """Return the cached glyph for a character, rasterizing it on a miss"""
+
+        key = (font_path, font_size, char)
+        with self._lock:
+            if key in self._glyphs:
+                self._glyphs.move_to_end(key)
+                self.hits += 1
+                return self._glyphs[key]
+            self.misses += 1
+
+        with self._raster_lock:
+            glyph = self._rasterize(font_path, font_size, char)
+
+        with self._lock:
+            if key not in self._glyphs:
+                self._glyphs[key] = glyph
+                self.current_bytes += glyph.nbytes if glyph else 128
+                self._evict()
+        return glyph
+
+    def get_variants(self, font_path, font_size, char, jitter, count=None):
+        """Return the cached GlyphVariants of a character, building all of them in one batch on a miss.
+
+        jitter is (rotation_var, slant, baseline_var) with the baseline range
+        in pixels at font_size. Copies are drawn from a generator seeded by
+        the character, so every process and resolution builds the same set.
+        """
+
+        count = count or self.config.GLYPH_VARIANTS
+        key = (font_path, font_size, char, jitter, count)
+        with self._lock:
+            if key in self._glyphs:
+                self._glyphs.move_to_end(key)
+                self.hits += 1
+                return self._glyphs[key]
+            self.misses += 1
+
+        glyph = self.get_glyph(font_path, font_size, char)
+        variants = None
+        if glyph is not None:
+            variants = jitter_variants(glyph, count, *jitter, rng=np.random.default_rng(ord(char)))
+
+        with self._lock:
+            if key not in self._glyphs:
+                self._glyphs[key] = variants
+                self.current_bytes += variants.nbytes if variants else 128
+                self._evict()
+        return variants
+
+    def _rasterize(self, font_path, font_size, char):
+        """Render a character into a tight 8-bit alpha mask"""
+
+        font = self.get_font(font_path, font_size)
+        if font is None:
+            return None
+
+        try:
+            # Metrics relative to the pen origin on the baseline
+            bbox = font.getbbox(char, anchor='ls')
+        except Exception as e:
+            logger.warning("Bbox calculation failed: %s", e)
+            return None
+
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        if text_width <= 0 or text_height <= 0:
+            return None
+
+        mask = Image.new('L', (text_width, text_height), 0)
+        ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), char, font=font, fill=255, anchor='ls')
+
+        return Glyph(np.array(mask, dtype=np.uint8), bbox[0], bbox[1])
+
+    def _evict(self):
+        """Drop least recently used glyphs until the byte budget is met"""
+
+        while self.current_bytes > self.max_bytes and self._glyphs:
+            _, glyph = self._glyphs.popitem(last=False)
+            self.current_bytes -= glyph.nbytes if glyph else 128
+            self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss counters and memory usage for cache sizing"""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'glyphs': len(self._glyphs),
+                'fonts': len(self._fonts),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def clear(self):
+        """Drop all cached glyphs and fonts"""
+
+        with self._lock:
+            self._glyphs.clear()
+            self._fonts.clear()
+            self.current_bytes = 0
@@ -0,0 +1,239 @@
+import os
+import mmap
+import struct
+import hashlib
+import logging
+import threading
+import numpy as np
+from fontTools.ttLib import TTFont
+from fontTools.pens.basePen import BasePen
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Cache file layout, all little-endian:
+#   header        magic, version, font size, font mtime (ns), units per em, glyphs, contours, points
+#   codepoints    uint32[glyphs], sorted
+#   glyph ranges  uint32[glyphs, 2] as (first contour, contour count)
+#   advances      float32[glyphs] in em units
+#   contour index uint32[contours + 1] as point offsets
+#   points        float32[points, 2] in em units, y down from the baseline
+MAGIC = b'HWOL'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQIIII')
+
+
+class _FlatteningPen(BasePen):
+    """Pen that records each contour as a polyline, flattening curves into fixed segments"""
+
+    def __init__(self, glyph_set, segments):
+        super().__init__(glyph_set)
+        self.contours = []
+        self._current = []
+        # Curve parameters, excluding the start point which is already recorded
+        t = np.linspace(0, 1, segments + 1)[1:, None]
+        self._t = t
+
+    def _moveTo(self, pt):
+        self._flush()
+        self._current = [pt]
+
+    def _lineTo(self, pt):
+        self._current.append(pt)
+
+    def _curveToOne(self, pt1, pt2, pt3):
+        p0, p1, p2, p3 = (np.array(p, dtype=np.float64) for p in (self._getCurrentPoint(), pt1, pt2, pt3))
+        t = self._t
+        points = ((1 - t) ** 3) * p0 + 3 * ((1 - t) ** 2) * t * p1 + 3 * (1 - t) * (t ** 2) * p2 + (t ** 3) * p3
+        self._current.extend(map(tuple, points))
+
+    def _qCurveToOne(self, pt1, pt2):
+        p0, p1, p2 = (np.array(p, dtype=np.float64) for p in (self._getCurrentPoint(), pt1, pt2))
+        t = self._t
+        points = ((1 - t) ** 2) * p0 + 2 * (1 - t) * t * p1 + (t ** 2) * p2
+        self._current.extend(map(tuple, points))
+
+    def _closePath(self):
+        if self._current and self._current[0] != self._current[-1]:
+            self._current.append(self._current[0])
+        self._flush()
+
+    def _endPath(self):
+        self._flush()
+
+    def _flush(self):
+        if len(self._current) > 1:
+            self.contours.append(np.array(self._current, dtype=np.float32))
+        self._current = []
+
+
+def build_outline_cache(font_path, cache_path, segments=None):
+    """Flatten every mapped glyph of a font and write the compact cache file; returns the glyph count"""
+
+    segments = segments or Config.OUTLINE_CURVE_SEGMENTS
+    stat = os.stat(font_path)
+    font = TTFont(font_path, lazy=True)
+    try:
+        units_per_em = font['head'].unitsPerEm
+        glyph_set = font.getGlyphSet()
+        hmtx = font['hmtx'].metrics
+
+        codepoints, ranges, advances, contours = [], [], [], []
+        for cp, name in sorted(font.getBestCmap().items()):
+            if name not in glyph_set:
+                continue
+            pen = _FlatteningPen(glyph_set, segments)
+            try:
+                glyph_set[name].draw(pen)
+            except Exception as e:
+                logger.warning("Skipping glyph %s of %s: %s", name, font_path, e)
+                continue
+
+            codepoints.append(cp)
+            ranges.append((len(contours), len(pen.contours)))
+            advances.append(hmtx[name][0] / units_per_em)
+            contours.extend(pen.contours)
+    finally:
+        font.close()
+
+    lengths = np.array([len(contour) for contour in contours], dtype=np.uint32)
+    offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.uint64))).astype(np.uint32)
+    if contours:
+        points = np.concatenate(contours) / np.float32(units_per_em)
+        # Fonts are y up; drawing is y down
+        points[:, 1] *= -1
+    else:
+        points = np.zeros((0, 2), dtype=np.float32)
+
+    # Write beside the target and move into place so readers never map a partial file
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, stat.st_size, stat.st_mtime_ns, units_per_em,
+                            len(codepoints), len(contours), len(points)))
+        f.write(np.array(codepoints, dtype='<u4').tobytes())
+        f.write(np.array(ranges, dtype='<u4').reshape(-1, 2).tobytes())
+        f.write(np.array(advances, dtype='<f4').tobytes())
+        f.write(offsets.astype('<u4').tobytes())
+        f.write(points.astype('<f4').tobytes())
+    os.replace(temp_path, cache_path)
+
+    return len(codepoints)
+
+
+class FontOutlines:
+    """Flattened glyph contours of one font, read straight from its memory-mapped cache file"""
+
+    def __init__(self, cache_path):
+        with open(cache_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.font_size, self.font_mtime, self.units_per_em,
+         glyphs, contours, points) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{cache_path} is not a version {VERSION} outline cache')
+
+        # Arrays are views into the mapping; pages are read in as glyphs are used
+        offset = HEADER.size
+        self.codepoints = np.frombuffer(self._map, '<u4', glyphs, offset)
+        offset += 4 * glyphs
+        self.glyph_ranges = np.frombuffer(self._map, '<u4', 2 * glyphs, offset).reshape(glyphs, 2)
+        offset += 8 * glyphs
+        self.advances = np.frombuffer(self._map, '<f4', glyphs, offset)
+        offset += 4 * glyphs
+        self.contour_offsets = np.frombuffer(self._map, '<u4', contours + 1, offset)
+        offset += 4 * (contours + 1)
+        self.points = np.frombuffer(self._map, '<f4', 2 * points, offset).reshape(points, 2)
+
+    def matches(self, font_path):
+        """True if the cache was built from the font file as it is now"""
+
+        stat = os.stat(font_path)
+        return stat.st_size == self.font_size and stat.st_mtime_ns == self.font_mtime
+
+    def _index(self, char):
+        cp = ord(char)
+        index = int(np.searchsorted(self.codepoints, cp))
+        if index < len(self.codepoints) and self.codepoints[index] == cp:
+            return index
+        return None
+
+    def contours(self, char):
+        """Contours of a character as (n, 2) arrays in em units, or None if the font lacks it"""
+
+        index = self._index(char)
+        if index is None:
+            return None
+        first, count = self.glyph_ranges[index]
+        return [self.points[self.contour_offsets[i]:self.contour_offsets[i + 1]] for i in range(first, first + count)]
+
+    def advance(self, char):
+        """Advance width of a character in em units, or None if the font lacks it"""
+
+        index = self._index(char)
+        return None if index is None else float(self.advances[index])
+
+
+class OutlineStore:
+    """Per-font outline caches on disk, built once and memory-mapped for lookups"""
+
+    def __init__(self, cache_dir=None):
+        self.config = Config()
+        self.cache_dir = cache_dir or self.config.OUTLINE_CACHE_FOLDER
+        self._fonts = {}
+        self._lock = threading.Lock()
+
+    def cache_path(self, font_path):
+        """Cache file of a font; fonts sharing a file name in different folders get their own"""
+
+        font_path = os.path.abspath(font_path)
+        digest = hashlib.sha1(font_path.encode('utf-8')).hexdigest()[:8]
+        name = os.path.splitext(os.path.basename(font_path))[0]
+        return os.path.join(self.cache_dir, f'{name}-{digest}.outlines')
+
+    def get(self, font_path):
+        """Return the FontOutlines of a font, building its cache file if missing or stale"""
+
+        font_path = os.path.abspath(font_path)
+        outlines = self._fonts.get(font_path)
+        if outlines is not None:
+            return outlines
+
+        with self._lock:
+            outlines = self._fonts.get(font_path)
+            if outlines is not None:
+                return outlines
+            try:
+                outlines = self._load(font_path)
+            except Exception as e:
+                logger.warning("Outline cache unavailable for %s: %s", font_path, e)
+                return None
+            self._fonts[font_path] = outlines
+            return outlines
+
+    def _load(self, font_path):
+        cache_path = self.cache_path(font_path)
+        if os.path.exists(cache_path):
+            try:
+                outlines = FontOutlines(cache_path)
+                if outlines.matches(font_path):
+                    return outlines
+            except (ValueError, struct.error) as e:
+                logger.warning("Rebuilding unreadable outline cache %s: %s", cache_path, e)
+
+        glyphs = build_outline_cache(font_path, cache_path)
+        logger.info("Built outline cache for %s (%d glyphs)", font_path, glyphs)
+        return FontOutlines(cache_path)
+
+    def load_all(self, font_dirs=None):
+        """Map the outline caches of every bundled font, building any that are missing; returns the count"""
+
+        font_dirs = font_dirs or [os.path.join(self.config.FONTS_FOLDER, language) for language in ('english', 'hindi')]
+        loaded = 0
+        for font_dir in font_dirs:
+            if not os.path.isdir(font_dir):
+                continue
+            for name in sorted(os.listdir(font_dir)):
+                if name.lower().endswith(('.ttf', '.otf')) and self.get(os.path.join(font_dir, name)):
+                    loaded += 1
+        return loaded
@@ -0,0 +1,125 @@
+import io
+import zlib
+import struct
+import numpy as np
+from PIL import Image
+from config import Config
+
+
+class ImageEncoder:
+    """Encodes rendered pages to PNG, palette PNG, WebP or JPEG"""
+    
+    # format name -> (mimetype, file extension)
+    FORMATS = {
+        'png': ('image/png', 'png'),
+        'png8': ('image/png', 'png'),
+        'webp': ('image/webp', 'webp'),
+        'jpeg': ('image/jpeg', 'jpg')
+    }
+    
+    def __init__(self):
+        self.config = Config()
+    
+    def normalize_format(self, fmt):
+        """Map user supplied format names onto a supported encoder"""
+        
+        fmt = (fmt or 'png').lower()
+        if fmt == 'jpg':
+            fmt = 'jpeg'
+        return fmt if fmt in self.FORMATS else 'png'
+    
+    def mimetype(self, fmt):
+        return self.FORMATS[self.normalize_format(fmt)][0]
+    
+    def extension(self, fmt):
+        return self.FORMATS[self.normalize_format(fmt)][1]
+    
+    def encode_to(self, image, fp, fmt='png', quality=None, compress_level=None, dpi=None):
+        """Encode an image into a path or file object; returns the mimetype"""
+        
+        fmt = self.normalize_format(fmt)
+        dpi = (dpi or self.config.DPI, dpi or self.config.DPI)
+        
+        if fmt == 'png':
+            level = compress_level if compress_level is not None else self.config.PNG_COMPRESS_LEVEL
+            image.save(fp, 'PNG', compress_level=int(level), dpi=dpi)
+        elif fmt == 'png8':
+            # The page is mostly paper plus one ink colour, so a small palette suffices
+            palette = image.convert('RGB').quantize(
+                colors=self.config.PNG_PALETTE_COLORS,
+                method=Image.Quantize.FASTOCTREE,
+                dither=Image.Dither.NONE
+            )
+            level = compress_level if compress_level is not None else self.config.PNG_COMPRESS_LEVEL
+            palette.save(fp, 'PNG', compress_level=int(level), dpi=dpi)
+        elif fmt == 'webp':
+            image.save(fp, 'WEBP', quality=int(quality or self.config.WEBP_QUALITY), method=4)
+        else:
+            image.convert('RGB').save(fp, 'JPEG', quality=int(quality or self.config.JPEG_QUALITY), dpi=dpi)
+        
+        return self.FORMATS[fmt][0]
+    
+    def encode(self, image, fmt='png', quality=None, compress_level=None, dpi=None):
+        """Encode an image into an in-memory buffer; returns (buffer, mimetype)"""
+        
+        buffer = io.BytesIO()
+        mimetype = self.encode_to(image, buffer, fmt, quality=quality, compress_level=compress_level, dpi=dpi)
+        buffer.seek(0)
+        return buffer, mimetype
+
+
+class PNGBandWriter:
+    """Streams an 8-bit RGB PNG to a file object one band of rows at a time.
+    
+    Rows are Sub-filtered and fed through a single zlib stream, so memory use
+    depends on the band height rather than on the size of the page.
+    """
+    
+    SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    
+    def __init__(self, fp, width, height, dpi=None, compress_level=None):
+        self.fp = fp
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        level = compress_level if compress_level is not None else Config.PNG_COMPRESS_LEVEL
+        self._compressor = zlib.compressobj(int(level))
+        
+        fp.write(self.SIGNATURE)
+        # 8 bits per sample, colour type 2 (RGB), default compression, filter and no interlace
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        if dpi:
+            pixels_per_metre = int(dpi / 0.0254 + 0.5)
+            self._chunk(b'pHYs', struct.pack('>IIB', pixels_per_metre, pixels_per_metre, 1))
+    
+    def _chunk(self, tag, data):
+        self.fp.write(struct.pack('>I', len(data)))
+        self.fp.write(tag)
+        self.fp.write(data)
+        self.fp.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff))
+    
+    def write(self, rows):
+        """Append a (rows, width, 3) uint8 band below the rows already written"""
+        
+        if rows.shape[1:] != (self.width, 3) or self.rows_written + rows.shape[0] > self.height:
+            raise ValueError(f'Band of shape {rows.shape} does not fit a {self.width}x{self.height} RGB image')
+        
+        # Sub filter: each byte minus the same channel of the pixel to its left, modulo 256
+        flat = rows.reshape(rows.shape[0], -1)
+        filtered = np.empty((rows.shape[0], flat.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:4] = flat[:, :3]
+        np.subtract(flat[:, 3:], flat[:, :-3], out=filtered[:, 4:])
+        
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+        self.rows_written += rows.shape[0]
+    
+    def close(self):
+        """Flush the compressed stream and finish the file"""
+        
+        if self.rows_written != self.height:
+            raise ValueError(f'Only {self.rows_written} of {self.height} rows were written')
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
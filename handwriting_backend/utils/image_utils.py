@@ -1,6 +1,5 @@
 import numpy as np
 from PIL import Image, ImageFilter
-import cv2
 
 class ImageUtils:
     
@@ -8,6 +7,8 @@ class ImageUtils:
     def add_ink_variation(image, intensity=0.3):
         """Add ink flow variation to simulate real pen writing"""
         
+        import cv2
+        
         img_array = np.array(image)
         
         # Create random ink intensity map
@@ -44,7 +45,13 @@ class ImageUtils:
                                [0.7, 0.8, 0.7]]),
             'ballpoint': np.array([[0.95, 1.0, 0.95],
                                   [1.0, 1.0, 1.0],
-                                  [0.95, 1.0, 0.95]])
+                                  [0.95, 1.0, 0.95]]),
+            'fountain': np.array([[0.8, 1.0, 0.8],
+                                 [1.0, 1.0, 1.0],
+                                 [0.8, 1.0, 0.8]]),
+            'gel': np.array([[0.9, 1.0, 0.9],
+                            [1.0, 1.0, 1.0],
+                            [0.9, 1.0, 0.9]])
         }
         
         return textures.get(style, textures['ink'])
\ No newline at end of file
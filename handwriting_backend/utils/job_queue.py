@@ -0,0 +1,259 @@
+import os
+import logging
+import json
+import uuid
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import closing
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at its configured depth"""
+
+
+class QueueClosedError(Exception):
+    """Raised when jobs are submitted to a queue that is not running"""
+
+
+class JobQueue:
+    """Persistent sqlite-backed render queue with a pool of worker threads"""
+    
+    def __init__(self, handler, db_path=None, workers=None, max_depth=None, retention=None):
+        self.config = Config()
+        self.handler = handler
+        self.db_path = db_path or self.config.JOB_DB_PATH
+        self.workers = workers if workers is not None else self.config.JOB_WORKERS
+        self.max_depth = max_depth if max_depth is not None else self.config.JOB_QUEUE_MAX
+        self.retention = retention if retention is not None else self.config.JOB_RETENTION
+        self._next_prune = 0.0
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._init_db()
+    
+    def _connect(self):
+        """Open a connection; sqlite connections are not shared between threads"""
+        
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_db(self):
+        """Create the jobs table if needed"""
+        
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+    
+    def start(self):
+        """Recover interrupted jobs and start the worker threads"""
+        
+        if self._running:
+            return
+        self._running = True
+        self._recover()
+        
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'render-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout=None):
+        """Stop accepting jobs and wait for the workers to finish their current job"""
+        
+        self._running = False
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def _recover(self):
+        """Requeue jobs left running by a process on this host that no longer exists"""
+        
+        hostname = socket.gethostname()
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+            for row in rows:
+                host, _, pid = (row['owner'] or '').rpartition(':')
+                if host == hostname and pid.isdigit() and self._process_alive(int(pid)):
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', progress = 0, owner = NULL, updated_at = ? "
+                    "WHERE id = ? AND status = 'running'",
+                    (time.time(), row['id'])
+                )
+                logger.info("Recovered interrupted job %s", row['id'])
+    
+    @staticmethod
+    def _process_alive(pid):
+        """Check whether a local process id is still running"""
+        
+        if pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    
+    def depth(self):
+        """Number of jobs waiting or in progress"""
+        
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+        return row[0]
+    
+    def submit(self, params):
+        """Persist a new job and wake a worker; returns the job id"""
+        
+        if not self._running:
+            raise QueueClosedError('Render queue is not accepting jobs')
+        
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # Depth check and insert happen in one write transaction
+            conn.execute('BEGIN IMMEDIATE')
+            depth = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if depth >= self.max_depth:
+                conn.execute('ROLLBACK')
+                raise QueueFullError(f'Render queue is full ({depth} jobs)')
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(params), now, now)
+            )
+            conn.execute('COMMIT')
+        
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+    
+    def get(self, job_id):
+        """Return the job status as a dict, or None if unknown"""
+        
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        
+        position = None
+        if row['status'] == 'queued':
+            with closing(self._connect()) as conn:
+                position = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+                    (row['created_at'],)
+                ).fetchone()[0]
+        
+        return {
+            'job_id': row['id'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'queue_position': position,
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+    
+    def update_progress(self, job_id, progress):
+        """Record progress for a running job (0.0 - 1.0)"""
+        
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?',
+                (min(1.0, max(0.0, progress)), time.time(), job_id)
+            )
+    
+    def prune(self):
+        """Delete finished and failed jobs last updated more than retention seconds ago; returns the count"""
+        
+        with closing(self._connect()) as conn:
+            removed = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at <= ?",
+                (time.time() - self.retention,)
+            ).rowcount
+        if removed:
+            logger.info("Pruned %d finished jobs", removed)
+        return removed
+    
+    def _claim(self):
+        """Atomically move the oldest queued job to running"""
+        
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                "SELECT id, params FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, updated_at = ? WHERE id = ?",
+                (self.owner, time.time(), row['id'])
+            )
+            conn.execute('COMMIT')
+        return row['id'], json.loads(row['params'])
+    
+    def _finish(self, job_id, status, result=None, error=None):
+        """Store the outcome of a job"""
+        
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, owner = NULL, updated_at = ? '
+                'WHERE id = ?',
+                (status, 1.0 if status == 'done' else 0.0,
+                 json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+    
+    def _worker_loop(self):
+        """Claim and run jobs until the queue is stopped"""
+        
+        while self._running:
+            claimed = self._claim()
+            if claimed is None:
+                # Idle workers prune old jobs, at most once per sample GC interval
+                if time.time() >= self._next_prune:
+                    self._next_prune = time.time() + self.config.SAMPLE_GC_INTERVAL
+                    try:
+                        self.prune()
+                    except sqlite3.Error as e:
+                        logger.warning("Job pruning failed: %s", e)
+                with self._wakeup:
+                    # Poll periodically too, other processes may enqueue work
+                    self._wakeup.wait(timeout=self.config.JOB_POLL_INTERVAL)
+                continue
+            
+            job_id, params = claimed
+            try:
+                result = self.handler(params, lambda progress: self.update_progress(job_id, progress))
+                self._finish(job_id, 'done', result=result)
+            except Exception as e:
+                logger.exception("Job %s failed: %s", job_id, e)
+                self._finish(job_id, 'failed', error=str(e))
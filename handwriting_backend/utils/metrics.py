@@ -0,0 +1,213 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond translation to multi-second documents
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    
+    type_name = 'counter'
+    
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def samples(self):
+        """Yield (name, labels, value) tuples for the exposition format"""
+        
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with optional labels"""
+    
+    type_name = 'histogram'
+    
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (non-cumulative), then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+    
+    def samples(self):
+        """Yield (name, labels, value) tuples for the exposition format"""
+        
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', labels + (('le', _format_value(float(bound))),), cumulative
+            yield f'{self.name}_bucket', labels + (('le', '+Inf'),), count
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format"""
+    
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+    
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+    
+    def add_collector(self, collector):
+        """Register a callable returning (name, type, help, [(labels, value), ...]) families at scrape time"""
+        
+        self._collectors.append(collector)
+    
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        
+        for collector in self._collectors:
+            for name, type_name, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {type_name}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}')
+        
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry scraped by /api/metrics
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'handwriting_stage_duration_seconds', 'Time spent in each rendering stage', labelnames=('stage',)
+)
+PAGES_RENDERED = REGISTRY.counter('handwriting_pages_rendered_total', 'Pages rendered')
+CHARACTERS_RENDERED = REGISTRY.counter('handwriting_characters_rendered_total', 'Non-space characters rendered')
+RESULT_CACHE_LOOKUPS = REGISTRY.counter(
+    'handwriting_result_cache_lookups_total', 'Single-page submissions by result cache outcome', labelnames=('result',)
+)
+
+# Stage timings of the current request (or page job) on this thread
+_local = threading.local()
+
+
+def observe_stage(stage, seconds):
+    """Record one stage duration, also noting it for the current collection if any"""
+    
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    events = getattr(_local, 'events', None)
+    if events is not None:
+        events.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage):
+    """Time the enclosed block as a rendering stage"""
+    
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def start_collecting():
+    """Begin capturing stage timings on this thread; returns the event list"""
+    
+    _local.events = []
+    return _local.events
+
+
+def stop_collecting():
+    """Stop capturing and return the (stage, seconds) events seen since start_collecting()"""
+    
+    events = getattr(_local, 'events', None) or []
+    _local.events = None
+    return events
+
+
+def server_timing(events, total=None):
+    """Format stage timings as a Server-Timing header value, summing repeated stages"""
+    
+    durations = {}
+    for stage, seconds in events:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    
+    entries = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in durations.items()]
+    if total is not None:
+        entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+def cache_families(cache_stats):
+    """Turn generator.cache_stats() into counter and gauge families for the registry"""
+    
+    def per_cache(field):
+        return [({'cache': name}, stats.get(field, 0)) for name, stats in sorted(cache_stats.items())]
+    
+    return [
+        ('handwriting_cache_hits_total', 'counter', 'Cache lookups served from memory', per_cache('hits')),
+        ('handwriting_cache_misses_total', 'counter', 'Cache lookups that had to build the entry', per_cache('misses')),
+        ('handwriting_cache_evictions_total', 'counter', 'Entries evicted to stay within the byte budget',
+         per_cache('evictions')),
+        ('handwriting_cache_bytes', 'gauge', 'Approximate bytes held by each cache', per_cache('bytes'))
+    ]
@@ -1,59 +1,349 @@
 from PIL import Image, ImageDraw
 import numpy as np
-from config import Config
+from config import Config, PageGeometry
 import random
+import threading
+from collections import OrderedDict
+
+
+def fractal_noise(height, width, cells, octaves, persistence, rng):
+    """Multi-octave value noise in [0, 1] as a float32 (height, width) array.
+    
+    Each octave is a coarse grid of random values, with cells grid cells
+    along the longer side doubled per octave, upsampled with bicubic
+    interpolation and weighted by persistence ** octave.
+    """
+    
+    import cv2
+    
+    noise = np.zeros((height, width), dtype=np.float32)
+    longest = max(height, width)
+    amplitude = 1.0
+    total = 0.0
+    for octave in range(octaves):
+        grid_cells = cells * 2 ** octave
+        grid = rng.random((max(2, round(grid_cells * height / longest)) + 1,
+                           max(2, round(grid_cells * width / longest)) + 1), dtype=np.float32)
+        noise += amplitude * cv2.resize(grid, (width, height), interpolation=cv2.INTER_CUBIC)
+        total += amplitude
+        amplitude *= persistence
+    
+    noise /= total
+    return np.clip(noise, 0, 1, out=noise)
+
+
+def _nbytes(template):
+    if isinstance(template, np.ndarray):
+        return template.nbytes
+    return template.width * template.height * len(template.getbands())
+
+
+class PaperTemplateCache:
+    """Pool of pre-built ruled paper backgrounds keyed by page geometry.
+    
+    Each geometry has pool_size numbered slots. A slot is built once from its
+    number, so asking for the same variant always returns the same paper.
+    """
+    
+    def __init__(self, pool_size=None, max_bytes=None):
+        config = Config()
+        self.pool_size = pool_size if pool_size is not None else config.PAPER_TEMPLATE_POOL_SIZE
+        self.max_bytes = max_bytes if max_bytes is not None else config.PAPER_CACHE_BYTES
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key, builder, variant=None):
+        """Return the template in slot variant % pool_size (a random slot if None), building it on first use.
+        
+        builder is called with the slot number and must derive all of its randomness from it.
+        """
+        
+        slot = self.slot(variant)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._pools.move_to_end(key)
+                template = pool.get(slot)
+                if template is not None:
+                    self.hits += 1
+                    return template
+            self.misses += 1
+        
+        template = builder(slot)
+        nbytes = _nbytes(template)
+        
+        with self._lock:
+            pool = self._pools.setdefault(key, {})
+            if slot not in pool and nbytes <= self.max_bytes:
+                pool[slot] = template
+                self.current_bytes += nbytes
+                self._evict(keep=key)
+        return template
+    
+    def peek(self, key, variant):
+        """Return the template already built in variant's slot, or None; never builds one"""
+        
+        slot = self.slot(variant)
+        with self._lock:
+            template = self._pools.get(key, {}).get(slot)
+            if template is not None:
+                self._pools.move_to_end(key)
+                self.hits += 1
+            return template
+    
+    def slot(self, variant=None):
+        """Pool slot used for a variant; a random slot when variant is None"""
+        
+        return (variant if variant is not None else random.randrange(self.pool_size)) % self.pool_size
+    
+    def _evict(self, keep):
+        """Drop least recently used pools until the byte budget is met"""
+        
+        while self.current_bytes > self.max_bytes:
+            key = next(iter(self._pools))
+            if key == keep:
+                # Trim the current pool instead of discarding it entirely
+                pool = self._pools[key]
+                if len(pool) <= 1:
+                    break
+                template = pool.pop(next(iter(pool)))
+                self.current_bytes -= _nbytes(template)
+            else:
+                for template in self._pools.pop(key).values():
+                    self.current_bytes -= _nbytes(template)
+            self.evictions += 1
+    
+    def stats(self):
+        """Return hit/miss counters and memory usage for cache sizing"""
+        
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'geometries': len(self._pools),
+                'templates': sum(len(pool) for pool in self._pools.values()),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes
+            }
+    
+    def clear(self):
+        """Drop all cached templates"""
+        
+        with self._lock:
+            self._pools.clear()
+            self.current_bytes = 0
+
 
 class PaperGenerator:
-    def __init__(self):
+    PAPER_COLOR = (252, 251, 248)  # Slight off-white
+    MARGIN_COLOR = (255, 192, 192)  # Red/pink
+    LINE_COLOR = (200, 200, 255)  # Light blue
+    AGED_COLOR = (236, 220, 182)  # Yellowed paper
+    STAIN_COLOR = (196, 160, 108)  # Darkest tea/foxing stain
+    # Rows drawn beyond each edge of a paper band; more than a wavy rule's vertical extent
+    BAND_RULE_PAD = 8
+    
+    def __init__(self, template_cache=None, aging_cache=None):
         self.config = Config()
+        self.template_cache = template_cache or PaperTemplateCache()
+        # Aging textures are few and large; they have their own pool and budget
+        self.aging_cache = aging_cache or PaperTemplateCache(self.config.AGED_TEXTURE_VARIANTS,
+                                                             self.config.AGED_TEXTURE_BYTES)
+    
+    def _template_key(self, geometry):
+        """Geometry and colours that fully determine a ruled page"""
+        
+        return (
+            geometry.dpi, self.config.A4_WIDTH, self.config.A4_HEIGHT,
+            self.config.LINE_HEIGHT, self.config.MARGIN_LEFT, self.config.MARGIN_RIGHT,
+            self.config.MARGIN_TOP, self.config.MARGIN_BOTTOM,
+            self.PAPER_COLOR, self.MARGIN_COLOR, self.LINE_COLOR
+        )
+    
+    def create_ruled_paper(self, use_cache=True, geometry=None, seed=None, aged=False):
+        """Return realistic A4 ruled paper, copied from the template pool when cached.
+        
+        The same seed always yields the same paper; without one a random variant is used.
+        Aged paper is yellowed and stained by a cached aging texture.
+        """
         
-    def create_ruled_paper(self):
-        """Create realistic A4 ruled paper background"""
+        geometry = geometry or PageGeometry()
+        if not use_cache:
+            return self._build_ruled_paper(geometry, seed, aged)
+        
+        template = self.template_cache.get(
+            self._template_key(geometry) + (aged,), lambda slot: self._build_ruled_paper(geometry, slot, aged),
+            variant=seed
+        )
+        return template.copy()
+    
+    def _build_ruled_paper(self, geometry, seed=None, aged=False):
+        """Create realistic A4 ruled paper background, reproducibly when seeded"""
+        
+        import cv2
         
         # Create base paper with slight off-white color
-        paper_color = (252, 251, 248)  # Slight off-white
-        paper = Image.new('RGB', (self.config.A4_WIDTH, self.config.A4_HEIGHT), paper_color)
-        draw = ImageDraw.Draw(paper)
+        paper = Image.new('RGB', (geometry.width, geometry.height), self.PAPER_COLOR)
+        self._draw_rules(ImageDraw.Draw(paper), geometry, self._rule_points(geometry, random.Random(seed)))
         
-        # Draw margin line (red/pink)
-        margin_color = (255, 192, 192)
-        margin_x = self.config.MARGIN_LEFT - 20
-        draw.line([(margin_x, 0), (margin_x, self.config.A4_HEIGHT)], 
-                 fill=margin_color, width=2)
+        # Add paper texture
+        paper = self._add_paper_noise(paper, seed)
+        
+        if aged:
+            pixels = np.asarray(paper).copy()
+            cv2.multiply(pixels, self.aging_texture(geometry, seed), dst=pixels, scale=1 / 255)
+            paper = Image.fromarray(pixels)
+        
+        return paper
+    
+    def aging_texture(self, geometry, variant=None):
+        """Cached uint8 RGB multiplier (255 = unchanged) that yellows and stains a page of this geometry"""
+        
+        return self.aging_cache.get(
+            self._template_key(geometry), lambda slot: self._build_aging_texture(geometry, slot), variant=variant
+        )
+    
+    def _build_aging_texture(self, geometry, seed):
+        """Yellowing, stains with darker tide lines, browned edges and paper fibres from fractal noise.
+        
+        The smooth layers are generated at 1/AGED_TEXTURE_SCALE of the page
+        resolution and upsampled once; fibres are drawn at full resolution.
+        """
+        
+        import cv2
+        
+        rng = np.random.default_rng(seed)
+        height = max(2, geometry.height // self.config.AGED_TEXTURE_SCALE)
+        width = max(2, geometry.width // self.config.AGED_TEXTURE_SCALE)
+        
+        # Uneven yellowing across the sheet
+        age = fractal_noise(height, width, 3, 4, 0.5, rng)
+        age *= 0.6
+        
+        # Stains where finer noise crosses a threshold, darker along their rims
+        stains = fractal_noise(height, width, 6, 5, 0.55, rng)
+        age += np.clip((stains - 0.66) * 3, 0, 0.3)
+        age += np.clip(1 - np.abs(stains - 0.66) * 40, 0, 1) * 0.15
+        
+        # Edges brown first
+        ys = np.abs(np.linspace(-1, 1, height, dtype=np.float32))[:, None]
+        xs = np.abs(np.linspace(-1, 1, width, dtype=np.float32))[None, :]
+        age += np.maximum(ys, xs) ** 8 * 0.5
+        np.clip(age, 0, 1, out=age)
+        
+        # Yellowing reaches AGED_COLOR at half age and STAIN_COLOR at full age
+        paper = np.array(self.PAPER_COLOR, dtype=np.float32)
+        aged = np.array(self.AGED_COLOR, dtype=np.float32) / paper
+        stained = np.array(self.STAIN_COLOR, dtype=np.float32) / paper
+        tint = np.where(age[..., None] < 0.5, 1 + (aged - 1) * (age[..., None] * 2),
+                        aged + (stained - aged) * (age[..., None] * 2 - 1))
+        multiplier = cv2.resize(np.clip(tint * 255, 0, 255).astype(np.uint8), (geometry.width, geometry.height),
+                                interpolation=cv2.INTER_LINEAR)
+        
+        # Short, faintly darker fibres, a few per square centimetre
+        fibres = int(geometry.width * geometry.height / geometry.dpi ** 2 * 6.45 * 3)
+        starts = rng.random((fibres, 2)) * (geometry.width, geometry.height)
+        angles = rng.uniform(0, np.pi, fibres)
+        lengths = rng.uniform(4, 16, fibres) * geometry.scale
+        ends = starts + lengths[:, None] * np.column_stack((np.cos(angles), np.sin(angles)))
+        shades = rng.integers(236, 250, fibres)
+        for shade in np.unique(shades):
+            selected = shades == shade
+            segments = np.stack((starts[selected], ends[selected]), axis=1).round().astype(np.int32)
+            cv2.polylines(multiplier, segments, False, (int(shade),) * 3, 1)
         
-        # Draw horizontal ruled lines
-        line_color = (200, 200, 255)  # Light blue
+        return multiplier
+    
+    def ruled_paper_bands(self, geometry, band_height, variant=None, aged=False):
+        """Yield (top, rows) uint8 RGB arrays covering a ruled page from top to bottom.
+        
+        Only one band exists at a time. The bands join into exactly the pooled
+        template for the same variant, so banded and whole-page renders match;
+        when that template is already pooled the bands are copied out of it.
+        """
+        
+        import cv2
+        
+        seed = self.template_cache.slot(variant)
+        template = self.template_cache.peek(self._template_key(geometry) + (aged,), seed)
+        if template is not None:
+            for top in range(0, geometry.height, band_height):
+                yield top, np.array(template.crop((0, top, geometry.width, min(top + band_height, geometry.height))))
+            return
+        
+        rules = self._rule_points(geometry, random.Random(seed))
+        rng = np.random.default_rng(seed)
+        aging = self.aging_texture(geometry, seed) if aged else None
+        
+        for top in range(0, geometry.height, band_height):
+            height = min(band_height, geometry.height - top)
+            # Rules are drawn with spare rows on both sides, so a line crossing the band's edge is
+            # rasterized as on the whole page instead of being clipped there
+            band = Image.new('RGB', (geometry.width, height + 2 * self.BAND_RULE_PAD), self.PAPER_COLOR)
+            self._draw_rules(ImageDraw.Draw(band), geometry, rules, offset_y=top - self.BAND_RULE_PAD)
+            pixels = np.asarray(band, dtype=np.float32)[self.BAND_RULE_PAD:self.BAND_RULE_PAD + height]
+            # Noise is drawn from one generator in row order, matching the whole-page noise
+            rows = self._noise(pixels, rng)
+            if aging is not None:
+                cv2.multiply(rows, aging[top:top + len(rows)], dst=rows, scale=1 / 255)
+            yield top, rows
+    
+    def _rule_points(self, geometry, rng):
+        """Wavy ruled lines as point lists in page pixels"""
+        
+        rules = []
+        
+        # Horizontal ruled lines are placed in base units so they line up with the text layout
         y = self.config.MARGIN_TOP
         
         while y < self.config.A4_HEIGHT - self.config.MARGIN_BOTTOM:
             # Add slight waviness to lines for realism
             points = []
             for x in range(0, self.config.A4_WIDTH, 50):
-                y_offset = random.gauss(0, 0.5)  # Slight random offset
-                points.append((x, y + y_offset))
-            
-            # Draw line with slight variations
-            for i in range(len(points) - 1):
-                draw.line([points[i], points[i + 1]], fill=line_color, width=1)
+                y_offset = rng.gauss(0, 0.5)  # Slight random offset
+                points.append((geometry.px(x), geometry.px(y) + y_offset * geometry.scale))
+            rules.append(points)
             
             y += self.config.LINE_HEIGHT
         
-        # Add paper texture
-        paper = self._add_paper_noise(paper)
+        return rules
+    
+    def _draw_rules(self, draw, geometry, rules, offset_y=0):
+        """Draw the margin and ruled lines onto an image whose first row is page row offset_y"""
         
-        return paper
+        # Draw margin line (red/pink)
+        margin_x = geometry.px(self.config.MARGIN_LEFT - 20)
+        draw.line([(margin_x, -offset_y), (margin_x, geometry.height - offset_y)],
+                  fill=self.MARGIN_COLOR, width=max(1, geometry.px(2)))
+        
+        for points in rules:
+            # Draw the whole wavy line as a single polyline
+            draw.line([(x, y - offset_y) for x, y in points], fill=self.LINE_COLOR, width=1)
     
-    def _add_paper_noise(self, image):
+    def _add_paper_noise(self, image, seed=None):
         """Add subtle paper texture"""
         
         # Convert to numpy array
-        img_array = np.array(image)
+        img_array = np.asarray(image, dtype=np.float32)
+        
+        return Image.fromarray(self._noise(img_array, np.random.default_rng(seed)))
+    
+    def _noise(self, img_array, rng):
+        """Add very subtle noise to a float32 pixel array, kept in float32 to halve the temporaries"""
         
-        # Add very subtle noise
-        noise = np.random.normal(0, 2, img_array.shape)
-        img_array = np.clip(img_array + noise, 0, 255).astype(np.uint8)
+        noise = rng.standard_normal(img_array.shape, dtype=np.float32)
+        noise *= 2
+        noise += img_array
+        np.clip(noise, 0, 255, out=noise)
         
-        return Image.fromarray(img_array)
+        return noise.astype(np.uint8)
     
     def add_paper_texture(self, image):
         """Add subtle paper texture overlay"""
@@ -0,0 +1,221 @@
+import os
+import logging
+import json
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SampleIndex:
+    """Durable sqlite index of generated samples shared by all worker processes"""
+    
+    # Row fields GC needs to delete a sample and to tell whether it changed since being selected
+    _GC_COLUMNS = 'id, path, document_path, full_path, page_ids, size_bytes, created_at, expires_at, accessed_at'
+    
+    def __init__(self, db_path=None, ttl=None, max_bytes=None):
+        self.config = Config()
+        self.db_path = db_path or self.config.SAMPLE_DB_PATH
+        self.ttl = ttl if ttl is not None else self.config.SAMPLE_TTL
+        self.max_bytes = max_bytes if max_bytes is not None else self.config.OUTPUT_MAX_BYTES
+        self._gc_thread = None
+        self._gc_stop = threading.Event()
+        self._init_db()
+    
+    def _connect(self):
+        """Open a connection; sqlite connections are not shared between threads"""
+        
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_db(self):
+        """Create the samples table if needed"""
+        
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS samples (
+                    id TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    document_path TEXT,
+                    page_ids TEXT,
+                    meta TEXT,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            # Full-resolution renders are produced lazily for preview-tier samples
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(samples)')]
+            if 'full_path' not in columns:
+                conn.execute('ALTER TABLE samples ADD COLUMN full_path TEXT')
+            # Disk-cap eviction goes by last use, which result-cache hits refresh
+            if 'accessed_at' not in columns:
+                conn.execute('ALTER TABLE samples ADD COLUMN accessed_at REAL')
+                conn.execute('UPDATE samples SET accessed_at = created_at')
+            conn.execute('CREATE INDEX IF NOT EXISTS samples_expires ON samples (expires_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS samples_created ON samples (created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS samples_accessed ON samples (accessed_at)')
+    
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.path.getsize(path) if path else 0
+        except OSError:
+            return 0
+    
+    def put(self, sample_id, path, document_path=None, page_ids=None, ttl=None, **meta):
+        """Register a rendered sample; extra keyword arguments are stored as metadata"""
+        
+        now = time.time()
+        # A document sample may use its combined file as its own path; count it once
+        size_bytes = sum(self._file_size(file_path) for file_path in {path, document_path})
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO samples '
+                '(id, path, document_path, page_ids, meta, size_bytes, created_at, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (sample_id, path, document_path, json.dumps(page_ids) if page_ids else None,
+                 json.dumps(meta), size_bytes, now, now + (ttl if ttl is not None else self.ttl), now)
+            )
+    
+    def get(self, sample_id):
+        """Return a live sample by id, or None if unknown or expired"""
+        
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT * FROM samples WHERE id = ? AND expires_at > ?', (sample_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        
+        sample = json.loads(row['meta']) if row['meta'] else {}
+        sample.update({
+            'path': row['path'],
+            'document_path': row['document_path'],
+            'full_path': row['full_path'],
+            'page_ids': json.loads(row['page_ids']) if row['page_ids'] else None,
+            'created_at': row['created_at'],
+            'expires_at': row['expires_at']
+        })
+        return sample
+    
+    def touch(self, sample_id, ttl=None):
+        """Mark a sample as used now and extend its expiry to a full TTL from now; never shortens it"""
+        
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE samples SET expires_at = MAX(expires_at, ?), accessed_at = ? WHERE id = ?',
+                (expires_at, now, sample_id)
+            )
+    
+    def set_full_path(self, sample_id, full_path):
+        """Attach a lazily rendered full-resolution file to an existing sample"""
+        
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE samples SET full_path = ?, size_bytes = size_bytes + ? WHERE id = ?',
+                (full_path, self._file_size(full_path), sample_id)
+            )
+    
+    def gc(self):
+        """Delete expired samples, then the least recently used ones until under the disk cap.
+        
+        Pages are samples of their own, so a document whose pages were
+        removed either way goes with them rather than linking to missing pages.
+        """
+        
+        removed = 0
+        with closing(self._connect()) as conn:
+            expired = conn.execute(
+                f'SELECT {self._GC_COLUMNS} FROM samples WHERE expires_at <= ?', (time.time(),)
+            ).fetchall()
+            removed += self._delete(conn, expired)
+            
+            total = conn.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM samples').fetchone()[0]
+            if total > self.max_bytes:
+                victims = []
+                for row in conn.execute(f'SELECT {self._GC_COLUMNS} FROM samples ORDER BY accessed_at'):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append(row)
+                    total -= row['size_bytes']
+                removed += self._delete(conn, victims)
+            
+            removed += self._delete(conn, self._orphaned_documents(conn))
+        
+        if removed:
+            logger.info("Sample GC removed %d samples", removed)
+        return removed
+    
+    def _orphaned_documents(self, conn):
+        """Document rows with at least one page sample no longer in the index"""
+        
+        orphaned = []
+        for row in conn.execute(f'SELECT {self._GC_COLUMNS} FROM samples WHERE page_ids IS NOT NULL').fetchall():
+            page_ids = json.loads(row['page_ids'])
+            placeholders = ', '.join('?' * len(page_ids))
+            live = conn.execute(f'SELECT COUNT(*) FROM samples WHERE id IN ({placeholders})', page_ids).fetchone()[0]
+            if live < len(page_ids):
+                orphaned.append(row)
+        return orphaned
+    
+    def _delete(self, conn, rows):
+        """Remove index rows, then the files of those that were still as selected; returns the count removed.
+        
+        Ids are content-addressed, so a sample may be re-rendered or touched
+        between selecting and deleting it. Such a row no longer matches and
+        keeps its files.
+        """
+        
+        removed = 0
+        for row in rows:
+            deleted = conn.execute(
+                'DELETE FROM samples WHERE id = ? AND created_at = ? AND expires_at = ? '
+                'AND accessed_at IS ? AND full_path IS ?',
+                (row['id'], row['created_at'], row['expires_at'], row['accessed_at'], row['full_path'])
+            ).rowcount
+            if not deleted:
+                continue
+            removed += 1
+            for path in (row['path'], row['document_path'], row['full_path']):
+                if path:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logger.warning("Failed to delete %s: %s", path, e)
+        return removed
+    
+    def start_gc(self, interval=None):
+        """Run gc() periodically on a background thread"""
+        
+        if self._gc_thread is not None:
+            return
+        interval = interval if interval is not None else self.config.SAMPLE_GC_INTERVAL
+        
+        def loop():
+            while not self._gc_stop.wait(interval):
+                try:
+                    self.gc()
+                except Exception as e:
+                    logger.exception("Sample GC failed: %s", e)
+        
+        self._gc_thread = threading.Thread(target=loop, name='sample-gc', daemon=True)
+        self._gc_thread.start()
+    
+    def stop_gc(self):
+        """Stop the background GC thread"""
+        
+        self._gc_stop.set()
+        if self._gc_thread is not None:
+            self._gc_thread.join()
+            self._gc_thread = None
@@ -0,0 +1,223 @@
+import re
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont, features
+from config import Config
+from utils.glyph_atlas import Glyph
+
+logger = logging.getLogger(__name__)
+
+# Complex text layout (HarfBuzz via libraqm) shapes conjuncts and matras correctly
+RAQM_AVAILABLE = features.check_feature('raqm')
+
+# Without shaping, the short-i matra has to be moved in front of its consonant cluster
+_SHORT_I = '\u093f'
+# A consonant (optionally with nukta) joined by viramas to further consonants
+_CLUSTER_BEFORE_SHORT_I = re.compile(
+    '((?:[\u0915-\u0939\u0958-\u095f]\u093c?\u094d)*[\u0915-\u0939\u0958-\u095f]\u093c?)\u093f'
+)
+
+
+def visual_order(word):
+    """Reorder a Devanagari word for renderers that draw codepoints in logical order"""
+
+    if _SHORT_I not in word:
+        return word
+    return _CLUSTER_BEFORE_SHORT_I.sub(lambda match: _SHORT_I + match.group(1), word)
+
+
+def load_frequency_list(path, limit=None):
+    """Read up to limit distinct words from a most-frequent-first word list.
+
+    One word per line; anything after a tab (such as a count) is ignored, as
+    are blank lines and lines starting with '#'.
+    """
+
+    words = []
+    seen = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            word = line.split('\t', 1)[0].strip()
+            if not word or word.startswith('#') or word in seen:
+                continue
+            seen.add(word)
+            words.append(word)
+            if limit is not None and len(words) >= limit:
+                break
+    return words
+
+
+class ShapedWord(Glyph):
+    """Raster of a whole shaped word plus its pen advance"""
+
+    __slots__ = ('advance',)
+
+    def __init__(self, mask, offset_x, offset_y, advance):
+        super().__init__(mask, offset_x, offset_y)
+        self.advance = advance
+
+
+class WordAtlas:
+    """Process-wide LRU of whole-word masks so a repeated word costs one blit.
+
+    Entries are keyed by (word, font path, font size, style). Shaped scripts
+    are rasterized by the font's layout engine; other scripts pass a builder
+    that composes the word from cached glyphs with the style's spacing.
+    """
+
+    # Shaped advances are tiny; this bounds their table by entry count
+    MAX_ADVANCES = 65536
+
+    def __init__(self, max_bytes=None):
+        self.config = Config()
+        self.max_bytes = max_bytes if max_bytes is not None else self.config.WORD_CACHE_BYTES
+        self.layout_engine = ImageFont.Layout.RAQM if RAQM_AVAILABLE else ImageFont.Layout.BASIC
+        self._fonts = {}
+        self._words = OrderedDict()
+        self._advances = {}
+        self._lock = threading.Lock()
+        # FreeType faces are not safe to rasterize from several threads at once
+        self._raster_lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prewarmed = 0
+
+    def get_font(self, font_path, font_size):
+        """Return one shared font handle per (font path, size) using the best layout engine"""
+
+        key = (font_path, font_size)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        try:
+            font = ImageFont.truetype(font_path, font_size, layout_engine=self.layout_engine)
+        except Exception as e:
+            logger.warning("Font loading failed: %s", e)
+            return None
+
+        self._fonts[key] = font
+        return font
+
+    def _shaping_text(self, word):
+        return word if self.layout_engine == ImageFont.Layout.RAQM else visual_order(word)
+
+    def advance(self, font_path, font_size, word):
+        """Shaped pen advance of a word in pixels, without rasterizing it"""
+
+        key = (font_path, font_size, word)
+        advance = self._advances.get(key)
+        if advance is not None:
+            return advance
+
+        font = self.get_font(font_path, font_size)
+        with self._raster_lock:
+            advance = font.getlength(self._shaping_text(word)) if font else 0.0
+
+        if len(self._advances) >= self.MAX_ADVANCES:
+            self._advances.clear()
+        self._advances[key] = advance
+        return advance
+
+    def get_word(self, font_path, font_size, word, style=None, builder=None):
+        """Return the cached word mask, building it on a miss.
+
+        builder is called with no arguments and returns a ShapedWord or None;
+        without one the word is shaped and rasterized from the font directly.
+        """
+
+        key = (word, font_path, font_size, style)
+        with self._lock:
+            if key in self._words:
+                self._words.move_to_end(key)
+                self.hits += 1
+                return self._words[key]
+            self.misses += 1
+
+        if builder is not None:
+            shaped = builder()
+        else:
+            with self._raster_lock:
+                shaped = self._rasterize(font_path, font_size, word)
+
+        with self._lock:
+            if key not in self._words:
+                self._words[key] = shaped
+                self.current_bytes += shaped.nbytes if shaped else 128
+                self._evict()
+        return shaped
+
+    def _rasterize(self, font_path, font_size, word):
+        """Shape and render a word into a tight 8-bit alpha mask anchored on the baseline"""
+
+        font = self.get_font(font_path, font_size)
+        if font is None:
+            return None
+
+        text = self._shaping_text(word)
+        try:
+            bbox = font.getbbox(text, anchor='ls')
+        except Exception as e:
+            logger.warning("Bbox calculation failed: %s", e)
+            return None
+
+        width = bbox[2] - bbox[0]
+        height = bbox[3] - bbox[1]
+        if width <= 0 or height <= 0:
+            return None
+
+        mask = Image.new('L', (width, height), 0)
+        ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), text, font=font, fill=255, anchor='ls')
+
+        return ShapedWord(np.array(mask, dtype=np.uint8), bbox[0], bbox[1], font.getlength(text))
+
+    def prewarm(self, words, render_word):
+        """Fill the cache ahead of traffic by calling render_word(word) for each word; returns words added"""
+
+        with self._lock:
+            before = len(self._words)
+        for word in words:
+            render_word(word)
+        with self._lock:
+            added = max(0, len(self._words) - before)
+            self.prewarmed += added
+        return added
+
+    def _evict(self):
+        """Drop least recently used words until the byte budget is met"""
+
+        while self.current_bytes > self.max_bytes and self._words:
+            _, shaped = self._words.popitem(last=False)
+            self.current_bytes -= shaped.nbytes if shaped else 128
+            self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss counters and memory usage for cache sizing"""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'words': len(self._words),
+                'prewarmed': self.prewarmed,
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'shaping': 'raqm' if self.layout_engine == ImageFont.Layout.RAQM else 'basic'
+            }
+
+    def clear(self):
+        """Drop all cached words, advances and fonts"""
+
+        with self._lock:
+            self._words.clear()
+            self._advances.clear()
+            self._fonts.clear()
+            self.current_bytes = 0
+            self.prewarmed = 0
@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers, e.g. gunicorn wsgi:application
+
+Importing app only builds the Flask application; this module also starts
+the background services that a serving process runs.
+"""
+
+from app import app, start_services
+
+start_services()
+
+application = app